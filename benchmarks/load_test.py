@@ -0,0 +1,83 @@
+"""
+Load test for `snt serve`. Starts a server on a throwaway database then hammers it from concurrent clients,
+each reusing its own connection, and reports requests/sec.
+
+    python benchmarks/load_test.py --clients 8 --requests 500 --write-ratio 0.2
+"""
+import argparse
+import random
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+from simple_note_taker.core.client import RemoteNotebook
+from simple_note_taker.core.server import create_server
+
+TAGS = ["work", "home", "ideas", "bugs"]
+
+
+def _client(server_url: str, token: str, username: str, requests: int, write_ratio: float, latencies: list):
+    notebook = RemoteNotebook(server_url, token=token)
+    for i in range(requests):
+        start = time.perf_counter()
+        if random.random() < write_ratio:
+            notebook.take(f"load test note {i} from {username}", [random.choice(TAGS)], shared=i % 2 == 0)
+        elif random.random() < 0.5:
+            notebook.notes(tag=random.choice(TAGS), limit=10)
+        else:
+            notebook.notes(limit=10)
+        latencies.append(time.perf_counter() - start)
+    notebook.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--clients", type=int, default=8, help="concurrent clients")
+    parser.add_argument("--requests", type=int, default=500, help="requests per client")
+    parser.add_argument("--write-ratio", type=float, default=0.2, help="fraction of requests which take a note")
+    parser.add_argument("--workers", type=int, default=8, help="server worker threads")
+    parser.add_argument("--seed-notes", type=int, default=1000, help="notes in the notebook before the test")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        tmp_path = Path(tmp_dir)
+        server = create_server(
+            str(tmp_path / "load_test.json"), str(tmp_path / "load_test_tokens.json"), port=0, workers=args.workers
+        )
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        server_url = f"http://127.0.0.1:{server.server_port}"
+
+        seeder = RemoteNotebook(server_url, token=server.tokens.issue("seeder"))
+        for i in range(args.seed_notes):
+            seeder.take(f"seed note {i}", [TAGS[i % len(TAGS)]], shared=True)
+        seeder.close()
+
+        latencies = []
+        usernames = [f"user{c}" for c in range(args.clients)]
+        clients = [
+            threading.Thread(
+                target=_client,
+                args=(server_url, server.tokens.issue(user), user, args.requests, args.write_ratio, latencies),
+            )
+            for user in usernames
+        ]
+        start = time.perf_counter()
+        for client in clients:
+            client.start()
+        for client in clients:
+            client.join()
+        elapsed = time.perf_counter() - start
+
+        server.shutdown()
+        server.server_close()
+
+    latencies.sort()
+    total = len(latencies)
+    print(f"{total} requests from {args.clients} clients in {elapsed:.2f}s")
+    print(f"{total / elapsed:.0f} requests/sec")
+    print(f"latency p50 {latencies[total // 2] * 1000:.1f}ms, p99 {latencies[int(total * 0.99)] * 1000:.1f}ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+"""
+Times N consecutive note takes against a fresh database with each storage setup: tinydb's in place JSON rewrite,
+the atomic temp file and rename storage, and atomic storage with write coalescing.
+
+    python benchmarks/take_benchmark.py --takes 500 --window-ms 50
+"""
+import argparse
+import tempfile
+import time
+from pathlib import Path
+
+from tinydb import JSONStorage, TinyDB
+from tinydb_serialization import SerializationMiddleware
+from tinydb_serialization.serializers import DateTimeSerializer
+
+from simple_note_taker.core.database import AtomicJSONStorage, CoalescingMiddleware
+from simple_note_taker.core.notes import Note
+
+JSON_KWARGS = dict(sort_keys=True, indent=4, separators=(",", ": "))
+
+
+def _serialization(storage_cls) -> SerializationMiddleware:
+    serialization = SerializationMiddleware(storage_cls)
+    serialization.register_serializer(DateTimeSerializer(), "TinyDate")
+    return serialization
+
+
+def _time_takes(storage, takes: int) -> float:
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        db = TinyDB(str(Path(tmp_dir) / "database.json"), storage=storage, **JSON_KWARGS)
+        notes = db.table("notes")
+        start = time.perf_counter()
+        for i in range(takes):
+            note = Note(f"benchmark note number {i} !task", tags=["benchmark"])
+            note._run_magic()
+            notes.insert(note._to_doc())
+        db.close()  # includes the final flush when coalescing
+        return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--takes", type=int, default=500, help="notes to take in a row")
+    parser.add_argument("--window-ms", type=int, default=50, help="coalescing window")
+    args = parser.parse_args()
+
+    setups = {
+        "in place (tinydb JSONStorage)": lambda: _serialization(JSONStorage),
+        "atomic": lambda: _serialization(AtomicJSONStorage),
+        f"atomic, coalescing {args.window_ms}ms": lambda: CoalescingMiddleware(
+            _serialization(AtomicJSONStorage), window=args.window_ms / 1000
+        ),
+    }
+    for name, storage in setups.items():
+        elapsed = _time_takes(storage(), args.takes)
+        print(f"{name:<32} {args.takes} takes in {elapsed:.2f}s, {args.takes / elapsed:.0f} takes/sec")
+
+
+if __name__ == "__main__":
+    main()
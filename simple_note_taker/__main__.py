@@ -1,3 +1,19 @@
-from .main import app
+import os
 
-app()
+
+def main():
+    # shell completion runs the whole cli on every TAB press, answer what we can before importing the app
+    complete_instruction = os.getenv("_SNT_COMPLETE")
+    if complete_instruction:
+        from simple_note_taker.core.shell_completion import complete_from_cache
+
+        if complete_from_cache(complete_instruction):
+            return
+
+    from simple_note_taker.main import app
+
+    app()
+
+
+if __name__ == "__main__":
+    main()
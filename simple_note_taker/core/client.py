@@ -0,0 +1,99 @@
+import json
+import select
+from http.client import HTTPConnection, HTTPException, RemoteDisconnected
+from typing import List, Optional
+from urllib.parse import urlencode, urlsplit
+
+from simple_note_taker.core.config import config
+from simple_note_taker.core.notes import NoteInDB
+
+
+class RemoteNotebookError(Exception):
+    def __init__(self, message: str, status: Optional[int] = None):
+        super().__init__(message)
+        self.status = status
+
+
+class RemoteNotebook:
+    """
+    Client for a notebook hosted by `snt serve`. Keeps one connection open and reuses it across requests.
+    Requests are made as the user `token` was issued to, or anonymously without one.
+    """
+
+    def __init__(self, server_url: str, token: Optional[str] = config.server_token, timeout: float = 10):
+        url = urlsplit(server_url if "//" in server_url else f"http://{server_url}")
+        if url.scheme != "http":
+            raise RemoteNotebookError(f"Unsupported scheme {url.scheme}://, snt servers only speak plain http")
+        self.token = token
+        self._connection = HTTPConnection(url.hostname, url.port or 80, timeout=timeout)
+
+    def _drop_stale_connection(self):
+        """
+        An idle kept-alive connection is only readable if the server has closed it, so don't send anything on it.
+        """
+        sock = self._connection.sock
+        if sock is not None and select.select([sock], [], [], 0)[0]:
+            self._connection.close()
+
+    def _request(self, method: str, path: str, payload: Optional[dict] = None) -> dict:
+        body = None if payload is None else json.dumps(payload)
+        headers = {"Content-Type": "application/json"}
+        if self.token is not None:
+            headers["Authorization"] = f"Bearer {self.token}"
+
+        self._drop_stale_connection()
+        for retry in (True, False):
+            reused = self._connection.sock is not None
+            try:
+                self._connection.request(method, path, body=body, headers=headers)
+            except (ConnectionError, HTTPException) as e:
+                # the request never made it out, so it's safe to send it again on a fresh connection
+                self._connection.close()
+                if retry and reused:
+                    continue
+                raise RemoteNotebookError(f"Could not reach {self._connection.host}: {e}")
+            try:
+                response = self._connection.getresponse()
+                raw = response.read()
+                break
+            except RemoteDisconnected as e:
+                # the server closed a reused connection without answering, only reads are safe to send again
+                self._connection.close()
+                if retry and reused and method == "GET":
+                    continue
+                raise RemoteNotebookError(f"Connection to {self._connection.host} closed: {e}")
+            except (HTTPException, OSError) as e:
+                # includes timeouts, where the server may well have acted on the request
+                self._connection.close()
+                raise RemoteNotebookError(f"No response from {self._connection.host}: {e}")
+
+        try:
+            data = json.loads(raw or "{}")
+        except json.JSONDecodeError as e:
+            raise RemoteNotebookError(f"Invalid response from {self._connection.host}: {e}", response.status)
+        if response.status >= 400:
+            raise RemoteNotebookError(data.get("error", response.reason), response.status)
+        return data
+
+    def close(self):
+        self._connection.close()
+
+    def take(self, content: str, tags: List[str] = (), private: bool = False, shared: bool = False) -> NoteInDB:
+        payload = {"content": content, "tags": list(tags), "private": private, "shared": shared}
+        return NoteInDB(**self._request("POST", "/notes", payload))
+
+    def get(self, note_id: int) -> Optional[NoteInDB]:
+        try:
+            return NoteInDB(**self._request("GET", f"/notes/{note_id}"))
+        except RemoteNotebookError as e:
+            if e.status == 404:
+                return None
+            raise
+
+    def notes(self, tag: Optional[str] = None, user: Optional[str] = None, limit: int = 0) -> List[NoteInDB]:
+        query = {k: v for k, v in {"tag": tag, "user": user, "limit": limit}.items() if v}
+        response = self._request("GET", f"/notes?{urlencode(query)}")
+        return [NoteInDB(**note) for note in response["notes"]]
+
+    def delete(self, note_id: int):
+        self._request("DELETE", f"/notes/{note_id}")
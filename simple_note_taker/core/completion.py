@@ -0,0 +1,84 @@
+import json
+import os
+import tempfile
+from typing import Dict, List, Tuple
+
+from simple_note_taker.core.config import snt_home_dir
+from simple_note_taker.core.shell_completion import empty_cache, note_id_choices, read_cache, tag_choices
+
+# Kept up to date as notes are written so shell completion never has to load the notes database
+completion_cache_path = snt_home_dir / "completion_cache.json"
+
+SUMMARY_LENGTH = 40
+
+
+def _read_cache() -> Dict:
+    return read_cache(completion_cache_path)
+
+
+def _write_cache(cache: Dict):
+    # write then swap so a TAB press mid-write never reads half a file, a temp file each so parallel runs don't collide
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(completion_cache_path), suffix=".tmp")
+    try:
+        with open(fd, "w") as f:
+            json.dump(cache, f)
+        os.replace(tmp_path, completion_cache_path)
+    except BaseException:
+        os.remove(tmp_path)
+        raise
+
+
+def _summary(content: str) -> str:
+    first_line = content.strip().split("\n")[0]
+    return first_line if len(first_line) <= SUMMARY_LENGTH else first_line[: SUMMARY_LENGTH - 3] + "..."
+
+
+def _add_note(cache: Dict, doc_id: int, content: str, tags: List[str]):
+    _remove_note(cache, doc_id)
+    tags = [tag for tag in tags if tag]
+    cache["ids"][str(doc_id)] = [_summary(content), tags]
+    for tag in tags:
+        cache["tags"][tag] = cache["tags"].get(tag, 0) + 1
+
+
+def _remove_note(cache: Dict, doc_id: int):
+    _, tags = cache["ids"].pop(str(doc_id), (None, []))
+    for tag in tags:
+        cache["tags"][tag] -= 1
+        if cache["tags"][tag] <= 0:
+            del cache["tags"][tag]
+
+
+# The cache is only a hint for completion, failing to update it shouldn't fail the note write that triggered it
+def cache_note(doc_id: int, content: str, tags: List[str]):
+    cache = _read_cache()
+    _add_note(cache, doc_id, content, tags)
+    try:
+        _write_cache(cache)
+    except OSError:
+        pass
+
+
+def uncache_note(doc_id: int):
+    cache = _read_cache()
+    _remove_note(cache, doc_id)
+    try:
+        _write_cache(cache)
+    except OSError:
+        pass
+
+
+def rebuild_completion_cache(docs: List[Dict]):
+    cache = empty_cache()
+    for doc in docs:
+        _add_note(cache, doc.doc_id, doc["content"], doc.get("tags", []))
+    _write_cache(cache)
+
+
+# Typer autocompletion callbacks, for completions the app answers itself rather than shell_completion
+def complete_note_ids(incomplete: str) -> List[Tuple[str, str]]:
+    return note_id_choices(_read_cache(), incomplete)
+
+
+def complete_tags(incomplete: str) -> List[str]:
+    return tag_choices(_read_cache(), incomplete)
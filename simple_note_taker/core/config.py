@@ -1,10 +1,10 @@
 import json
 import os
-from dataclasses import asdict, dataclass
+from dataclasses import asdict, dataclass, field
 from pathlib import Path
 from typing import Union
 
-from simple_note_taker import __version__
+from simple_note_taker.__version__ import __version__
 
 APP_NAME = "simpleNoteTaker"
 
@@ -29,7 +29,12 @@ class Configuration:
 
     default_notebook: str = "notes"
     db_file_path: str = str(snt_home_dir / "database.json")
-    metadata: MetaData = MetaData()
+    history_file_path: str = str(snt_home_dir / "history.jsonl")  # append only log of note edits
+    server_url: str = None  # shared notebook server used by `snt remote`
+    server_token: str = None  # token the server issued you with `snt issue-token`
+    server_db_file_path: str = str(snt_home_dir / "server_database.json")  # database hosted by `snt serve`
+    server_tokens_file_path: str = str(snt_home_dir / "server_tokens.json")  # users of `snt serve`, tokens hashed
+    metadata: MetaData = field(default_factory=MetaData)
 
 
 def write_config_to_file(configuration: Configuration):
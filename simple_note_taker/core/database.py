@@ -1,17 +1,272 @@
-from tinydb import JSONStorage, TinyDB
+import atexit
+import contextlib
+import hashlib
+import json
+import os
+import stat
+import tempfile
+import threading
+from functools import lru_cache
+from typing import Any, Dict, List, Optional
+
+from tinydb import TinyDB
+from tinydb.middlewares import Middleware
+from tinydb.storages import Storage, touch
 from tinydb_serialization import SerializationMiddleware
 from tinydb_serialization.serializers import DateTimeSerializer
 
 from simple_note_taker.core.config import config
 
-_serialization = SerializationMiddleware(JSONStorage)
-_serialization.register_serializer(DateTimeSerializer(), "TinyDate")
-
-tiny_db = TinyDB(
-    path=config.db_file_path,
-    storage=_serialization,
-    # json.dump() kwargs
-    sort_keys=True,
-    indent=4,
-    separators=(",", ": "),
-)
+try:
+    import fcntl
+except ImportError:  # windows
+    fcntl = None
+    import msvcrt
+
+
+class DatabaseCorruptedError(IOError):
+    pass
+
+
+def _checksum(contents: str) -> str:
+    return hashlib.sha256(contents.encode()).hexdigest()
+
+
+def _fsync_dir(directory: str):
+    if hasattr(os, "O_DIRECTORY"):
+        # make a rename itself durable, not possible on windows
+        dir_fd = os.open(directory, os.O_RDONLY | os.O_DIRECTORY)
+        try:
+            os.fsync(dir_fd)
+        finally:
+            os.close(dir_fd)
+
+
+def _replace_file(path: str, contents: str, encoding: Optional[str], mode: int):
+    """
+    Writes `contents` to a temporary file next to `path` which then replaces it.
+    """
+    directory, name = os.path.split(path)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=f".{name}.", suffix=".tmp")
+    try:
+        os.chmod(tmp_path, mode)  # mkstemp files are owner only
+        with open(fd, "w", encoding=encoding) as f:
+            f.write(contents)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.remove(tmp_path)
+        raise
+    _fsync_dir(directory)
+
+
+def _lock_file(f):
+    if fcntl is not None:
+        fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+        return
+    while True:
+        try:
+            msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+            return
+        except OSError:
+            pass  # LK_LOCK gives up after 10 seconds, keep waiting like flock
+
+
+def _unlock_file(f):
+    if fcntl is not None:
+        fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+    else:
+        msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+class _FileLock:
+    """
+    An exclusive lock on the file at `path` between processes, which the thread holding it can take again.
+    """
+
+    def __init__(self, path: str):
+        self._path = path
+        self._thread_lock = threading.RLock()
+        self._depth = 0
+        self._file = None
+
+    def __enter__(self):
+        self._thread_lock.acquire()
+        if self._depth == 0:
+            try:
+                self._file = open(self._path, "a")
+                _lock_file(self._file)
+            except BaseException:
+                if self._file is not None:
+                    self._file.close()
+                    self._file = None
+                self._thread_lock.release()
+                raise
+        self._depth += 1
+        return self
+
+    def __exit__(self, *exc_info):
+        self._depth -= 1
+        if self._depth == 0:
+            try:
+                _unlock_file(self._file)
+            finally:
+                self._file.close()
+                self._file = None
+        self._thread_lock.release()
+
+
+@lru_cache(maxsize=None)
+def _database_lock(real_path: str) -> _FileLock:
+    # one per database, so every storage of it in a process shares the lock
+    return _FileLock(f"{real_path}.lock")
+
+
+class AtomicJSONStorage(Storage):
+    """
+    A JSON file storage which never writes over the database in place. Each write goes to a temporary file which then
+    replaces the database, so a crash or Ctrl-C mid-write leaves the previous version whole. If the database is a
+    symlink its target is replaced, keeping the link, and the file keeps its mode.
+
+    The database stays plain TinyDB JSON, its checksum is kept beside it in `<database>.sha256` and checked on every
+    read. The checksum file lists the checksum of the previous version too, as it's written before the database is
+    replaced. Databases without a checksum file are read unchecked.
+
+    Writes hold `lock`, a lock on `<database>.lock`, so processes writing at once can't leave the checksum file
+    listing another process' write.
+    """
+
+    def __init__(self, path: str, create_dirs=False, encoding=None, **kwargs):
+        super().__init__()
+        self._path = path
+        self._encoding = encoding
+        self.kwargs = kwargs
+        touch(path, create_dirs=create_dirs)
+        self.lock = _database_lock(os.path.realpath(path))
+
+    def _checksum_path(self) -> str:
+        return f"{os.path.realpath(self._path)}.sha256"
+
+    def _saved_checksums(self) -> Optional[List[str]]:
+        try:
+            with open(self._checksum_path()) as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+
+    def read(self) -> Optional[Dict[str, Dict[str, Any]]]:
+        with open(self._path, encoding=self._encoding) as f:
+            contents = f.read()
+        if not contents.strip():
+            # new database, let TinyDB initialise it
+            return None
+
+        checksum = _checksum(contents)
+        saved_checksums = self._saved_checksums()
+        if saved_checksums is not None and checksum not in saved_checksums:
+            raise DatabaseCorruptedError(
+                f"Checksum of {self._path} does not match its contents. If you edited it by hand, delete "
+                f"{self._checksum_path()} and it will be saved again on the next write."
+            )
+        return json.loads(contents)
+
+    def write(self, data: Dict[str, Dict[str, Any]]):
+        contents = json.dumps(data, **self.kwargs)
+        real_path = os.path.realpath(self._path)
+        with self.lock:
+            with open(real_path, encoding=self._encoding) as f:
+                previous_checksum = _checksum(f.read())
+
+            mode = stat.S_IMODE(os.stat(real_path).st_mode)
+            # a crash between these leaves the previous database, which the checksum file still lists
+            _replace_file(self._checksum_path(), json.dumps([_checksum(contents), previous_checksum]), None, mode)
+            _replace_file(real_path, contents, self._encoding, mode)
+
+
+class CoalescingMiddleware(Middleware):
+    """
+    Holds writes in memory and flushes only the latest state once `window` seconds have passed since the first
+    unflushed write, so bursts of writes cost a single file write. For scripts writing many notes through TinyDB, the
+    commands write once each so gain nothing from it.
+
+    A write returns before anything is saved, call `flush()` or `close()` before treating it as saved: they raise if
+    saving fails. Anything still unflushed is written at exit, where a failure can only be printed.
+    """
+
+    def __init__(self, storage_cls, window: float):
+        super().__init__(storage_cls)
+        self._window = window
+        self._pending = None
+        self._lock = threading.RLock()
+        self._timer = None
+        atexit.register(self.flush)
+
+    def read(self):
+        with self._lock:
+            if self._pending is not None:
+                return self._pending
+        return self.storage.read()
+
+    def write(self, data):
+        with self._lock:
+            self._pending = data
+            if self._timer is None:
+                self._timer = threading.Timer(self._window, self.flush)
+                self._timer.daemon = True
+                self._timer.start()
+
+    def flush(self):
+        with self._lock:
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+            if self._pending is not None:
+                self.storage.write(self._pending)
+                self._pending = None
+
+    def close(self):
+        try:
+            self.flush()
+        finally:
+            atexit.unregister(self.flush)
+            self.storage.close()
+
+
+def _serialization() -> SerializationMiddleware:
+    # a middleware instance holds the storage it opens, so each database needs its own
+    serialization = SerializationMiddleware(AtomicJSONStorage)
+    serialization.register_serializer(DateTimeSerializer(), "TinyDate")
+    return serialization
+
+
+# json.dump() kwargs
+_JSON_KWARGS = dict(sort_keys=True, indent=4, separators=(",", ": "))
+
+
+@lru_cache(maxsize=None)
+def get_tiny_db() -> TinyDB:
+    """
+    Opened on first use rather than import, so commands and shell completion which never touch notes don't pay for it.
+    """
+    return TinyDB(path=config.db_file_path, storage=_serialization(), **_JSON_KWARGS)
+
+
+def write_lock(db: TinyDB):
+    """
+    Hold around reading the database and writing back changes, so another process can't write in between and have
+    its write lost. Databases not saved by `AtomicJSONStorage` aren't shared between processes and need no lock.
+    """
+    storage = db.storage
+    while isinstance(storage, Middleware):
+        storage = storage.storage
+    if isinstance(storage, AtomicJSONStorage):
+        return storage.lock
+    return contextlib.nullcontext()
+
+
+def open_storage(path: str) -> Storage:
+    """
+    The storage a database at `path` is saved with, for callers keeping their own copy of the data in memory.
+    """
+    return _serialization()(path, **_JSON_KWARGS)
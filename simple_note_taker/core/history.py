@@ -0,0 +1,134 @@
+import base64
+import json
+import os
+import zlib
+from datetime import datetime
+from difflib import SequenceMatcher
+from typing import List, Optional, Tuple, Union
+
+from simple_note_taker.core.config import config
+
+# Kept out of the notes database, which is rewritten on every save, and only read by history commands
+history_file_path = config.history_file_path
+
+_AT_FORMAT = "%Y-%m-%dT%H:%M:%S.%f"
+
+# Each line is one of
+#   {"notebook": "notes", "note_id": 1, "at": "<iso date>", "prev_crc": <crc32 of the content before the edit>,
+#    "crc": <crc32 of the edited content>, "delta": "<edited -> previous content>"}
+#   {"notebook": "notes", "note_id": 1, "deleted": true}  - doc ids get reused, history before this is another note's
+# Edits are recorded before they are saved to the notes database, so history is never missing an edit which was saved.
+# An edit which was recorded but never saved (a crash in between) is skipped when its note's history is rebuilt.
+
+# (revision number, when or None if it was made outside of snt, content)
+Revision = Tuple[int, Optional[datetime], str]
+
+
+def _crc(content: str) -> int:
+    return zlib.crc32(content.encode())
+
+
+def _delta(from_content: str, to_content: str) -> str:
+    """
+    Compressed instructions to rebuild `to_content` from `from_content`: spans of it to copy and new text to insert.
+    """
+    ops: List[Union[List[int], str]] = []
+    for tag, i1, i2, j1, j2 in SequenceMatcher(None, from_content, to_content, autojunk=False).get_opcodes():
+        if tag == "equal":
+            ops.append([i1, i2])
+        elif j2 > j1:
+            ops.append(to_content[j1:j2])
+    return base64.b64encode(zlib.compress(json.dumps(ops, separators=(",", ":")).encode())).decode()
+
+
+def _apply_delta(from_content: str, delta: str) -> str:
+    ops = json.loads(zlib.decompress(base64.b64decode(delta)))
+    return "".join(from_content[op[0] : op[1]] if isinstance(op, list) else op for op in ops)
+
+
+def _append(record: dict):
+    with open(history_file_path, "a") as f:
+        f.write(json.dumps(record, separators=(",", ":")) + "\n")
+        f.flush()
+        os.fsync(f.fileno())
+
+
+def _note_records(notebook: str, note_id: int) -> List[dict]:
+    records = []
+    try:
+        with open(history_file_path) as f:
+            for line in f:
+                record = json.loads(line)
+                # records from before notebooks were saved are all from the default one
+                if record["note_id"] != note_id or record.get("notebook", config.default_notebook) != notebook:
+                    continue
+                if record.get("deleted"):
+                    records = []
+                else:
+                    records.append(record)
+    except FileNotFoundError:
+        pass
+    return records
+
+
+def record_revision(notebook: str, note_id: int, previous_content: str, content: str):
+    _append(
+        {
+            "notebook": notebook,
+            "note_id": note_id,
+            "at": datetime.now().strftime(_AT_FORMAT),
+            "prev_crc": _crc(previous_content),
+            "crc": _crc(content),
+            "delta": _delta(content, previous_content),
+        }
+    )
+
+
+def record_deletion(notebook: str, note_id: int):
+    _append({"notebook": notebook, "note_id": note_id, "deleted": True})
+
+
+def _unsaved_edits(records: List[dict], content_crc: int) -> Optional[int]:
+    """
+    How many of the latest `records` are edits which were never saved, if that explains the note having content with
+    `content_crc`. None if it doesn't, the content was changed outside of snt.
+    """
+    for saved in range(len(records) - 1, -1, -1):
+        if records[saved]["crc"] == content_crc:
+            unsaved_from = saved + 1
+            break
+    else:
+        unsaved_from = 0
+    if unsaved_from < len(records) and records[unsaved_from].get("prev_crc") == content_crc:
+        return len(records) - unsaved_from
+    return None
+
+
+def note_revisions(
+    notebook: str, note_id: int, content: str, taken_at: datetime
+) -> Tuple[List[Revision], Optional[str]]:
+    """
+    Every version of a note which can be rebuilt as (revision number, when, content), oldest first, and a warning if
+    any can't be. Revision 0 is the note as taken and the last is `content`, its current content. Older versions are
+    rebuilt by undoing each edit from the current one back. The current content is always listed, even when it was
+    changed outside of snt and none of the history leads to it.
+    """
+    records = _note_records(notebook, note_id)
+    versions = []
+    while records:
+        if _crc(content) != records[-1]["crc"]:
+            unsaved = _unsaved_edits(records, _crc(content))
+            if unsaved is None:
+                if not versions:
+                    # the latest edit wasn't recorded, so there's no telling when it was made
+                    versions.append((len(records) + 1, None, content))
+                earliest = versions[-1][0]
+                warning = f"Note {note_id} was changed outside of snt, history before revision {earliest} is lost."
+                return versions[::-1], warning
+            records = records[: len(records) - unsaved]
+            continue
+        record = records.pop()
+        versions.append((len(records) + 1, datetime.strptime(record["at"], _AT_FORMAT), content))
+        content = _apply_delta(content, record["delta"])
+    versions.append((0, taken_at, content))
+    return versions[::-1], None
@@ -1,21 +1,103 @@
 import re
 from datetime import datetime, timedelta
-from typing import List, Optional
+from typing import Iterator, List, Optional, Pattern, Tuple
 
 from pydantic.main import BaseModel
 from pytimeparse import parse
 from rapidfuzz import fuzz, process
+from rapidfuzz.utils import default_process
 from tinydb import Query
 from tinydb.table import Table
 
 from simple_note_taker.core.config import config
-from simple_note_taker.core.database import tiny_db
+from simple_note_taker.core.completion import cache_note, rebuild_completion_cache, uncache_note
+from simple_note_taker.core.database import get_tiny_db, write_lock
+from simple_note_taker.core.history import Revision, note_revisions, record_deletion, record_revision
 
 DATE_FORMAT = "%H:%M, %a %d %b %Y"
 
+_REGEX_QUANTIFIERS = "*?{"
+_REGEX_META = ".^$+|()[]\\" + _REGEX_QUANTIFIERS
+
+# (field value, [(start, end), ...]) for each value of a note field that a pattern matched
+FieldMatches = List[Tuple[str, List[Tuple[int, int]]]]
+
 
 def _get_note_db(db_name: str = config.default_notebook) -> Table:
-    return tiny_db.table(db_name)
+    return get_tiny_db().table(db_name)
+
+
+def _search_tokens(text: str) -> List[str]:
+    return sorted(set(default_process(text).split()))
+
+
+def _raw_values(doc: dict, field: str) -> List[str]:
+    value = doc.get(field)
+    if value is None:
+        return []
+    return [str(v) for v in value] if isinstance(value, list) else [str(value)]
+
+
+def _is_ascii(text: str) -> bool:
+    try:
+        text.encode("ascii")
+        return True
+    except UnicodeEncodeError:
+        return False
+
+
+def _required_literal(pattern: str) -> str:
+    """
+    The longest run of plain characters that every match of a regex must contain, or "" if there isn't a safe one.
+    Used to skip notes with a substring check before running the regex over them.
+    """
+    if "|" in pattern:
+        return ""
+
+    runs, run, i = [], "", 0
+    while i < len(pattern):
+        char = pattern[i]
+        if char == "\\" and i + 1 < len(pattern) and not pattern[i + 1].isalnum():
+            run += pattern[i + 1]  # an escaped symbol e.g. \. is a literal
+            i += 2
+            continue
+        if char in "([\\":
+            break  # groups, classes and escapes like \d or \x41 aren't plain text, stop collecting here
+        if char in _REGEX_QUANTIFIERS:
+            run = run[:-1]  # the quantified character may not appear at all
+            if char == "{":
+                i = pattern.find("}", i)
+                if i == -1:
+                    break
+        if char in _REGEX_META:
+            runs.append(run)
+            run = ""
+        else:
+            run += char
+        i += 1
+    return max(runs + [run], key=len)
+
+
+def _grep_docs(pattern: Pattern, field: str, since: Optional[datetime] = None) -> Iterator[Tuple[dict, FieldMatches]]:
+    """
+    Yields raw note documents with a `field` value matching the case-insensitive `pattern`, alongside the matched spans.
+    Every note is scanned, those which can't contain the pattern's required literal text skip the regex.
+    """
+    literal = _required_literal(pattern.pattern).lower()
+    if not _is_ascii(literal):
+        literal = ""
+
+    for doc in _get_note_db().all():
+        if since is not None and doc["taken_at"] < since:
+            continue
+        values = _raw_values(doc, field)
+        # str.lower() only agrees with re.IGNORECASE for ascii (e.g. "ſ" matches "s"), leave other values to the regex
+        if literal and not any(literal in value.lower() or not _is_ascii(value) for value in values):
+            continue
+        matches = [(value, [m.span() for m in pattern.finditer(value)]) for value in values]
+        matches = [(value, spans) for value, spans in matches if spans]
+        if matches:
+            yield doc, matches
 
 
 class Note(BaseModel):
@@ -43,14 +125,17 @@ class Note(BaseModel):
     def _note_id_str(self) -> str:
         return "Unsaved note"
 
-    def pretty_str(self) -> str:
+    def pretty_str(self, content: Optional[str] = None) -> str:
+        """
+        Optionally pass `content` to display in place of the note content, e.g. with search terms highlighted.
+        """
         time_taken_str = self.taken_at.strftime(DATE_FORMAT)
         task_str = "   "
         if self.task:
             task_x = "x" if self.task_complete else " "
             task_str = f"[{task_x}]"  # e.g. [x] for a task which is done
 
-        return f"{self._note_id_str()}: {time_taken_str} | {task_str} | {self.content}"
+        return f"{self._note_id_str()}: {time_taken_str} | {task_str} | {content or self.content}"
 
     def __lt__(self, other) -> bool:
         return self.taken_at < other.taken_at
@@ -93,11 +178,20 @@ class Note(BaseModel):
         for command in commands:
             magic_commands[command]()
 
+    def _to_doc(self) -> dict:
+        """
+        The note as saved, with its search tokens precomputed alongside so searches don't redo this for every note.
+        The tokens are a database detail rather than a model field, they're ignored when a note is loaded.
+        """
+        return {**self.dict(exclude={"doc_id"}), "search_tokens": _search_tokens(self.content)}
+
     def save(self, run_magic=True) -> "NoteInDB":
         if run_magic:
             self._run_magic()
 
-        note_id = _get_note_db().insert(self.dict())
+        with write_lock(get_tiny_db()):
+            note_id = _get_note_db().insert(self._to_doc())
+            cache_note(note_id, self.content, self.tags)
         return Notes.get_by_id(note_id)
 
     def mark_as_done(self):
@@ -122,16 +216,44 @@ class NoteInDB(Note):
         return f"Note {self.doc_id}{spacer}"
 
     def delete(self) -> int:
-        remove_res = _get_note_db().remove(doc_ids=[self.doc_id])
+        with write_lock(get_tiny_db()):
+            remove_res = _get_note_db().remove(doc_ids=[self.doc_id])
+            uncache_note(self.doc_id)
+            record_deletion(config.default_notebook, self.doc_id)
         return remove_res[0]
 
     def update(self, run_magic=False):
         if run_magic:
             self._run_magic()
 
-        update_res = _get_note_db().update(self.dict(exclude={"doc_id"}), doc_ids=[self.doc_id])
+        with write_lock(get_tiny_db()):
+            previous_content = _get_note_db().get(doc_id=self.doc_id)["content"]
+            if previous_content != self.content:
+                # recorded first, history rebuilding skips an edit which didn't make it to the database
+                record_revision(config.default_notebook, self.doc_id, previous_content, self.content)
+            update_res = _get_note_db().update(self._to_doc(), doc_ids=[self.doc_id])
+            cache_note(self.doc_id, self.content, self.tags)
         return update_res
 
+    def revisions(self) -> Tuple[List[Revision], Optional[str]]:
+        """
+        Every version of this note's content which can be rebuilt as (revision number, when, content), oldest first,
+        and a warning if some can't be.
+        """
+        return note_revisions(config.default_notebook, self.doc_id, self.content, self.taken_at)
+
+    def revert(self, revision: int) -> bool:
+        """
+        Sets the content back to that of an earlier revision, saved as a new revision. False if there's no such one.
+        """
+        versions, _ = self.revisions()
+        contents = {rev: content for rev, _, content in versions}
+        if revision not in contents:
+            return False
+        self.content = contents[revision]
+        self.update()
+        return True
+
 
 class Notes:
     @staticmethod
@@ -165,17 +287,54 @@ class Notes:
 
     @staticmethod
     def find_match(query: str, field: str) -> List[NoteInDB]:
-        query = Query()[field].search(query, flags=re.IGNORECASE)
-        search_res = _get_note_db().search(query)
+        pattern = re.compile(query, flags=re.IGNORECASE)
+        search_res = [n for n in _get_note_db().all() if any(pattern.search(v) for v in _raw_values(n, field))]
         return [NoteInDB(**n, doc_id=n.doc_id) for n in search_res]
 
+    @staticmethod
+    def grep(
+        pattern: Pattern, field: str = "content", since: Optional[datetime] = None
+    ) -> Iterator[Tuple[NoteInDB, FieldMatches]]:
+        """
+        Lazily finds notes where `field` matches the compiled `pattern`, with the matched spans of each value.
+        """
+        for n, matches in _grep_docs(pattern, field, since):
+            yield NoteInDB(**n, doc_id=n.doc_id), matches
+
+    @staticmethod
+    def grep_count(pattern: Pattern, field: str = "content", since: Optional[datetime] = None) -> int:
+        return sum(1 for _ in _grep_docs(pattern, field, since))
+
     @staticmethod
     def search(query: str, result_size: int = 5) -> List[NoteInDB]:
-        all_notes_dict = {note.doc_id: note.content for note in Notes.all()}
+        all_docs = {n.doc_id: n for n in _get_note_db().all()}
+        # notes saved before search tokens existed are tokenized on the fly until `snt reindex` is run
+        all_notes_dict = {
+            doc_id: " ".join(n.get("search_tokens") or _search_tokens(n["content"])) for doc_id, n in all_docs.items()
+        }
         search_results = process.extract(
-            query, choices=all_notes_dict, scorer=fuzz.token_set_ratio, limit=result_size, score_cutoff=20
+            " ".join(_search_tokens(query)),
+            choices=all_notes_dict,
+            scorer=fuzz.token_set_ratio,
+            processor=None,
+            limit=result_size,
+            score_cutoff=20,
         )
-        return [Notes.get_by_id(res_record[2]) for res_record in search_results]
+        return [NoteInDB(**all_docs[res_record[2]], doc_id=res_record[2]) for res_record in search_results]
+
+    @staticmethod
+    def reindex() -> int:
+        """
+        Recompute the saved search tokens for every note, backfilling notes saved by older versions.
+        """
+
+        def _index_doc(doc: dict):
+            doc["search_tokens"] = _search_tokens(doc["content"])
+
+        with write_lock(get_tiny_db()):
+            reindexed = _get_note_db().update(_index_doc)
+            rebuild_completion_cache(_get_note_db().all())
+        return len(reindexed)
 
     @staticmethod
     def all_tasks(include_complete: bool = False) -> List[NoteInDB]:
@@ -194,6 +353,3 @@ class Notes:
             for note in Notes.all()
             if note.task and not note.task_complete and note.reminder is not None and note.reminder < now
         ]
-
-
-n = Notes("ws")
@@ -0,0 +1,593 @@
+import hashlib
+import io
+import json
+import os
+import re
+import secrets
+import select
+import selectors
+import socket
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from typing import Callable, Dict, List, Optional, Set, Tuple
+from urllib.parse import parse_qs, urlsplit
+
+from pydantic import ValidationError
+
+from simple_note_taker.core.config import config
+from simple_note_taker.core.database import open_storage
+from simple_note_taker.core.notes import Note, NoteInDB
+
+DEFAULT_PORT = 8642
+
+# fields clients may set when taking a note, everything else is decided by the server
+_CLIENT_NOTE_FIELDS = {"content", "tags", "private", "shared"}
+_SEARCH_FIELDS = {"search_tokens"}
+
+
+class StoreWriteError(Exception):
+    pass
+
+
+class TokenStore:
+    """
+    Bearer tokens issued to the users of a server. Only hashes are saved, so the file alone can't be used to log in.
+    The file is reloaded when it changes, so tokens issued while the server runs work straight away.
+    """
+
+    def __init__(self, path: str):
+        self._path = path
+        self._lock = threading.Lock()
+        self._loaded_mtime = None
+        self._users_by_hash: Dict[str, str] = {}
+
+    @staticmethod
+    def _hash(token: str) -> str:
+        return hashlib.sha256(token.encode()).hexdigest()
+
+    def _load(self):
+        try:
+            mtime = os.stat(self._path).st_mtime_ns
+        except FileNotFoundError:
+            mtime = None
+        if mtime == self._loaded_mtime:
+            return
+        users_by_hash = {}
+        if mtime is not None:
+            with open(self._path) as f:
+                users_by_hash = json.load(f)
+        self._users_by_hash, self._loaded_mtime = users_by_hash, mtime
+
+    def username(self, token: str) -> Optional[str]:
+        with self._lock:
+            self._load()
+            return self._users_by_hash.get(self._hash(token))
+
+    def issue(self, username: str) -> str:
+        """
+        A new token for `username`, replacing any they had before.
+        """
+        token = secrets.token_urlsafe(32)
+        with self._lock:
+            self._load()
+            users_by_hash = {h: user for h, user in self._users_by_hash.items() if user != username}
+            users_by_hash[self._hash(token)] = username
+
+            fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(self._path)), suffix=".tmp")
+            try:
+                with open(fd, "w") as f:
+                    json.dump(users_by_hash, f, sort_keys=True, indent=4)
+                os.replace(tmp_path, self._path)  # mkstemp files are only readable by their owner, which we keep
+            except BaseException:
+                os.remove(tmp_path)
+                raise
+        return token
+
+
+class NotebookStore:
+    """
+    A shared notebook held in memory with indexes by tag and user, so reads never touch the database file.
+    Writes are applied in memory then saved together by a flusher thread, each writer waiting for the flush covering
+    its write. If that flush fails the write is undone and the writer gets a StoreWriteError.
+    """
+
+    def __init__(self, db_path: str, notebook: str = config.default_notebook, flush_interval: float = 0.02):
+        self._storage = open_storage(db_path)
+        self._notebook = notebook
+        self._flush_interval = flush_interval
+
+        tables = self._storage.read() or {}
+        self._other_tables = {name: table for name, table in tables.items() if name != notebook}
+        self._notes: Dict[int, dict] = {}
+        self._by_tag: Dict[str, Set[int]] = {}
+        self._by_user: Dict[str, Set[int]] = {}
+        for doc_id, doc in tables.get(notebook, {}).items():
+            self._index(int(doc_id), doc)
+        self._next_id = max(self._notes, default=0) + 1
+
+        self._lock = threading.Condition()
+        self._write_generation = 0  # bumped by every write
+        self._flushed_generation = 0  # writes up to here have had a flush attempted
+        self._durable_generation = 0  # writes up to here are on disk
+        self._flush_error: Optional[Exception] = None
+        self._undo_log: List[Tuple[int, Callable[[], None]]] = []
+        self._closed = False
+        self._flusher = threading.Thread(target=self._flush_loop, name="snt-flusher", daemon=True)
+        self._flusher.start()
+
+    # Indexes
+    def _index(self, doc_id: int, doc: dict):
+        self._notes[doc_id] = doc
+        for tag in doc.get("tags", []):
+            self._by_tag.setdefault(tag, set()).add(doc_id)
+        self._by_user.setdefault(doc.get("user"), set()).add(doc_id)
+
+    def _unindex(self, doc_id: int):
+        doc = self._notes.pop(doc_id, None)
+        if doc is None:
+            return
+        for tag in doc.get("tags", []):
+            self._by_tag[tag].discard(doc_id)
+        self._by_user[doc.get("user")].discard(doc_id)
+
+    @staticmethod
+    def _visible(doc: dict, username: Optional[str]) -> bool:
+        """
+        Owners see all their notes, everyone else only sees notes which are shared and not private.
+        """
+        return (username is not None and doc.get("user") == username) or (doc.get("shared") and not doc.get("private"))
+
+    # Write batching
+    def _commit(self, undo: Callable[[], None]):
+        """
+        Called holding the lock after changing the notes in memory, returns once the change is on disk.
+        """
+        self._write_generation += 1
+        generation = self._write_generation
+        self._undo_log.append((generation, undo))
+        self._lock.notify_all()
+        while self._flushed_generation < generation:
+            self._lock.wait()
+        if self._durable_generation < generation:
+            raise StoreWriteError(f"Could not save the notebook: {self._flush_error}")
+
+    def _flush_loop(self):
+        while True:
+            with self._lock:
+                while self._write_generation == self._flushed_generation and not self._closed:
+                    self._lock.wait()
+                if self._write_generation == self._flushed_generation:
+                    return  # closed with nothing left to write
+            time.sleep(self._flush_interval)  # let writes arriving meanwhile join this flush
+
+            with self._lock:
+                generation = self._write_generation
+                # docs are never changed in place, so a shallow copy is a consistent snapshot
+                tables = {**self._other_tables, self._notebook: {str(i): doc for i, doc in self._notes.items()}}
+
+            # written without the lock held so reads carry on during the flush
+            try:
+                self._storage.write(tables)
+                error = None
+            except Exception as e:
+                error = e
+
+            with self._lock:
+                flushed_undos = [undo for undo_generation, undo in self._undo_log if undo_generation <= generation]
+                self._undo_log = self._undo_log[len(flushed_undos) :]
+                if error is None:
+                    self._durable_generation = generation
+                else:
+                    self._flush_error = error
+                    for undo in reversed(flushed_undos):
+                        undo()
+                self._flushed_generation = generation
+                self._lock.notify_all()
+
+    def close(self):
+        with self._lock:
+            self._closed = True
+            self._lock.notify_all()
+        self._flusher.join()
+        self._storage.close()
+
+    # Notebook operations
+    def take(self, username: str, note_fields: dict) -> NoteInDB:
+        note_fields = {k: v for k, v in note_fields.items() if k in _CLIENT_NOTE_FIELDS}
+        note = Note(**{**note_fields, "user": username, "taken_at": datetime.now()})
+        note._run_magic()
+        doc = note._to_doc()
+        with self._lock:
+            doc_id = self._next_id
+            self._next_id += 1
+            self._index(doc_id, doc)
+            self._commit(undo=lambda: self._unindex(doc_id))
+        return NoteInDB.construct(**doc, doc_id=doc_id)
+
+    def get(self, username: Optional[str], doc_id: int) -> Optional[NoteInDB]:
+        with self._lock:
+            doc = self._notes.get(doc_id)
+        if doc is None or not self._visible(doc, username):
+            return None
+        return NoteInDB.construct(**doc, doc_id=doc_id)
+
+    def notes(
+        self, username: Optional[str], tag: Optional[str] = None, user: Optional[str] = None, limit: int = 0
+    ) -> List[NoteInDB]:
+        """
+        Notes visible to `username`, newest first. Optionally only those with `tag` or taken by `user`.
+        """
+        with self._lock:
+            candidate_ids = set(self._notes)
+            if tag is not None:
+                candidate_ids &= self._by_tag.get(tag, set())
+            if user is not None:
+                candidate_ids &= self._by_user.get(user, set())
+
+            # the server stamps notes as they are taken, so a higher id is always a newer note
+            visible = []
+            for doc_id in sorted(candidate_ids, reverse=True):
+                doc = self._notes[doc_id]
+                if self._visible(doc, username):
+                    visible.append((doc_id, doc))
+                    if len(visible) == limit:
+                        break
+        # indexed notes were validated when taken, skip doing it again on every read
+        return [NoteInDB.construct(**doc, doc_id=doc_id) for doc_id, doc in visible]
+
+    def delete(self, username: str, doc_id: int) -> bool:
+        """
+        Only the owner can delete a note, returns False if they can't or it doesn't exist.
+        """
+        with self._lock:
+            doc = self._notes.get(doc_id)
+            if doc is None or doc.get("user") != username:
+                return False
+            self._unindex(doc_id)
+            self._commit(undo=lambda: self._index(doc_id, doc))
+        return True
+
+
+MAX_REQUEST_SIZE = 1024 * 1024
+
+_HEAD_END = re.compile(rb"\r?\n\r?\n")
+_CONTENT_LENGTH = re.compile(rb"\ncontent-length:[ \t]*([0-9]+)", re.IGNORECASE)
+
+
+def _request_length(received: bytes) -> Optional[int]:
+    """
+    Length of the first request in `received` once all of it has arrived, None until then. Requests with a body over
+    MAX_REQUEST_SIZE are cut at the end of their head, the handler rejects them.
+    """
+    head_end = _HEAD_END.search(received)
+    if head_end is None:
+        return None
+    content_length = _CONTENT_LENGTH.search(received, 0, head_end.end())
+    body_length = int(content_length.group(1)) if content_length else 0
+    if body_length > MAX_REQUEST_SIZE:
+        return head_end.end()
+    request_length = head_end.end() + body_length
+    return request_length if len(received) >= request_length else None
+
+
+class _Connection:
+    """
+    A client connection and whatever it has sent which hasn't been handled yet.
+    """
+
+    def __init__(self, sock: socket.socket, client_address: Tuple):
+        self.sock = sock
+        self.client_address = client_address
+        self.received = b""
+        self.waiting_since = time.monotonic()  # since it went idle, or its partly received request started arriving
+
+    def receive(self) -> bool:
+        """
+        Reads what has arrived, call once the socket is readable. False once the client has gone.
+        """
+        try:
+            data = self.sock.recv(65536)
+        except OSError:
+            return False
+        if not data:
+            return False
+        if not self.received:
+            self.waiting_since = time.monotonic()
+        self.received += data
+        return True
+
+    def has_request(self) -> bool:
+        return _request_length(self.received) is not None
+
+    def take_request(self) -> bytes:
+        length = _request_length(self.received)
+        request, self.received = self.received[:length], self.received[length:]
+        return request
+
+
+class PooledHTTPServer(HTTPServer):
+    """
+    Serves requests from a fixed pool of worker threads. Connections wait in a selector until a whole request has
+    arrived, so a worker only ever handles a request it can read straight away and never waits on a slow or idle
+    client. Connections idle too long, or too slow sending a request, are closed.
+    """
+
+    idle_timeout = 60
+    request_timeout = 10  # for a request to arrive once it has started
+    linger = 0.01
+
+    def __init__(self, server_address: Tuple[str, int], store: NotebookStore, tokens: TokenStore, workers: int = 8):
+        super().__init__(server_address, NotebookRequestHandler)
+        self.store = store
+        self.tokens = tokens
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="snt-worker")
+        self._closing = False
+
+        self._waiting = selectors.DefaultSelector()
+        self._to_wait_lock = threading.Lock()
+        self._to_wait: List[_Connection] = []
+        self._wake_receiver, self._wake_sender = socket.socketpair()
+        self._waiting.register(self._wake_receiver, selectors.EVENT_READ)
+        self._watcher = threading.Thread(target=self._watch_connections, name="snt-connections", daemon=True)
+        self._watcher.start()
+
+    def process_request(self, request, client_address):
+        request.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        request.settimeout(NotebookRequestHandler.timeout)  # for sending responses
+        self._wait_for_request(_Connection(request, client_address))
+
+    def _wait_for_request(self, connection: _Connection):
+        with self._to_wait_lock:
+            self._to_wait.append(connection)
+        try:
+            self._wake_sender.send(b"\0")
+        except OSError:
+            pass  # closing, server_close closes it
+
+    def _handle_request(self, connection: _Connection):
+        try:
+            keep_open = not self.RequestHandlerClass(connection, connection.client_address, self).close_connection
+        except Exception:
+            self.handle_error(connection.sock, connection.client_address)
+            keep_open = False
+
+        if not keep_open or self._closing:
+            self._close_connection(connection)
+        elif connection.has_request() or self._next_request_arrived(connection):
+            self._pool.submit(self._handle_request, connection)
+        elif connection.sock.fileno() != -1:
+            self._wait_for_request(connection)
+
+    def _next_request_arrived(self, connection: _Connection) -> bool:
+        """
+        Whether the next request arrives within `linger`. Busy clients send their next request straight away, waiting
+        briefly for it saves a trip through the selector.
+        """
+        if not select.select([connection.sock], [], [], self.linger)[0]:
+            return False
+        if not connection.receive():
+            self._close_connection(connection)
+            return False
+        return connection.has_request()
+
+    def _watch_connections(self):
+        while not self._closing:
+            for key, _ in self._waiting.select(timeout=1):
+                if key.fileobj is self._wake_receiver:
+                    self._wake_receiver.recv(4096)
+                    with self._to_wait_lock:
+                        to_wait, self._to_wait = self._to_wait, []
+                    for connection in to_wait:
+                        if connection.has_request():
+                            self._pool.submit(self._handle_request, connection)
+                        else:
+                            self._waiting.register(connection.sock, selectors.EVENT_READ, connection)
+                    continue
+
+                connection = key.data
+                if not connection.receive():
+                    self._waiting.unregister(connection.sock)
+                    self._close_connection(connection)
+                elif connection.has_request():
+                    self._waiting.unregister(connection.sock)
+                    self._pool.submit(self._handle_request, connection)
+                elif len(connection.received) > MAX_REQUEST_SIZE:
+                    self._waiting.unregister(connection.sock)
+                    self._close_connection(connection)  # a request head this big isn't one of ours
+
+            now = time.monotonic()
+            for key in list(self._waiting.get_map().values()):
+                connection = key.data
+                if connection is None:
+                    continue
+                timeout = self.request_timeout if connection.received else self.idle_timeout
+                if now - connection.waiting_since > timeout:
+                    self._waiting.unregister(connection.sock)
+                    self._close_connection(connection)
+
+        for key in list(self._waiting.get_map().values()):
+            if key.data is not None:
+                self._close_connection(key.data)
+
+    def _close_connection(self, connection: _Connection):
+        self.shutdown_request(connection.sock)
+
+    def server_close(self):
+        super().server_close()
+        self._closing = True
+        self._wake_sender.send(b"\0")
+        self._watcher.join()
+        self._pool.shutdown(wait=True)
+        for connection in self._to_wait:  # finished their request as the watcher stopped
+            self._close_connection(connection)
+        self._waiting.close()
+        self._wake_receiver.close()
+        self._wake_sender.close()
+        self.store.close()
+
+
+class NotebookRequestHandler(BaseHTTPRequestHandler):
+    """
+    JSON API for the shared notebook. Requests are made as the user a bearer token was issued to, or anonymously:
+        GET /notes?tag=&user=&limit=  - notes visible to the requester, newest first
+        GET /notes/ID                 - a single note
+        POST /notes                   - take a note, body of content, tags, private and shared
+        DELETE /notes/ID              - delete a note the requester owns
+    Handles a single request which has already been received, the server decides what happens to the connection
+    afterwards.
+    """
+
+    protocol_version = "HTTP/1.1"  # keep-alive, so clients can reuse their connection
+    timeout = 10  # for sending a response
+    server: PooledHTTPServer
+    request: _Connection
+
+    def setup(self):
+        self.connection = self.request.sock
+        self.rfile = io.BytesIO(self.request.take_request())
+        self.wfile = self.connection.makefile("wb")  # buffered, so headers and body go out in one write
+
+    def handle(self):
+        self.close_connection = True
+        self.handle_one_request()
+
+    def finish(self):
+        try:
+            self.wfile.flush()
+        finally:
+            self.wfile.close()
+
+    def log_message(self, format, *args):
+        pass  # logging every request to stderr costs more than serving it
+
+    def _send_json(self, status: int, body: dict):
+        encoded = json.dumps(body, default=str).encode()  # default=str for datetimes
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(encoded)))
+        self.end_headers()
+        self.wfile.write(encoded)
+
+    def _send_error(self, status: int, message: str):
+        self._send_json(status, {"error": message})
+
+    def _username(self) -> Optional[str]:
+        """
+        The user the request's bearer token was issued to, None for anonymous requests.
+        Raises PermissionError for a token the server didn't issue.
+        """
+        authorization = self.headers.get("Authorization")
+        if authorization is None:
+            return None
+        scheme, _, token = authorization.partition(" ")
+        username = self.server.tokens.username(token) if scheme == "Bearer" else None
+        if username is None:
+            raise PermissionError("Unknown token, ask the server admin for one with `snt issue-token`")
+        return username
+
+    def _route(self) -> Tuple[Optional[int], dict]:
+        """
+        Splits the path into an optional note id and query arguments, raises LookupError for unknown paths.
+        """
+        url = urlsplit(self.path)
+        parts = [part for part in url.path.split("/") if part]
+        query = {k: v[-1] for k, v in parse_qs(url.query).items()}
+        if parts == ["notes"]:
+            return None, query
+        if len(parts) == 2 and parts[0] == "notes" and re.fullmatch("[0-9]+", parts[1]):
+            return int(parts[1]), query
+        raise LookupError(self.path)
+
+    def _dispatch(self, method_handler: Callable[[Optional[str], Optional[int], dict, bytes], None]):
+        try:
+            content_length = int(self.headers.get("Content-Length", 0))
+        except ValueError:
+            self.close_connection = True
+            return self._send_error(400, "Invalid Content-Length")
+        body = self.rfile.read(content_length)
+        if len(body) < content_length:
+            # only cut short when over MAX_REQUEST_SIZE, the rest of it is still to arrive so drop the connection
+            self.close_connection = True
+            return self._send_error(413, f"Requests can be at most {MAX_REQUEST_SIZE} bytes")
+        try:
+            note_id, query = self._route()
+        except LookupError:
+            return self._send_error(404, f"No route {self.path}")
+        try:
+            username = self._username()
+        except PermissionError as e:
+            return self._send_error(401, str(e))
+
+        try:
+            method_handler(username, note_id, query, body)
+        except StoreWriteError as e:
+            self._send_error(500, str(e))
+
+    def do_GET(self):
+        self._dispatch(self._get)
+
+    def do_POST(self):
+        self._dispatch(self._post)
+
+    def do_DELETE(self):
+        self._dispatch(self._delete)
+
+    def _get(self, username: Optional[str], note_id: Optional[int], query: dict, body: bytes):
+        if note_id is not None:
+            note = self.server.store.get(username, note_id)
+            if note is None:
+                return self._send_error(404, f"No note under id {note_id} found.")
+            return self._send_json(200, _note_json(note))
+
+        try:
+            limit = int(query.get("limit", 0))
+        except ValueError:
+            return self._send_error(400, "limit must be a number")
+        notes = self.server.store.notes(username, tag=query.get("tag"), user=query.get("user"), limit=limit)
+        self._send_json(200, {"notes": [_note_json(note) for note in notes]})
+
+    def _post(self, username: Optional[str], note_id: Optional[int], query: dict, body: bytes):
+        if note_id is not None:
+            return self._send_error(404, f"No route {self.path}")
+        if username is None:
+            return self._send_error(401, "Taking notes needs a token, ask the server admin for one")
+
+        try:
+            note_fields = json.loads(body)
+        except ValueError as e:
+            return self._send_error(400, f"Invalid JSON: {e}")
+        if not isinstance(note_fields, dict):
+            return self._send_error(400, "A note must be a JSON object")
+        try:
+            note = self.server.store.take(username, note_fields)
+        except (TypeError, ValidationError) as e:
+            return self._send_error(400, f"Invalid note: {e}")
+        self._send_json(201, _note_json(note))
+
+    def _delete(self, username: Optional[str], note_id: Optional[int], query: dict, body: bytes):
+        if note_id is None:
+            return self._send_error(404, f"No route {self.path}")
+        if username is None:
+            return self._send_error(401, "Deleting notes needs a token, ask the server admin for one")
+
+        if not self.server.store.delete(username, note_id):
+            return self._send_error(404, f"No note of yours under id {note_id} found.")
+        self._send_json(200, {"deleted": note_id})
+
+
+def _note_json(note: NoteInDB) -> dict:
+    return note.dict(exclude=_SEARCH_FIELDS)
+
+
+def create_server(
+    db_path: str, tokens_path: str, host: str = "127.0.0.1", port: int = DEFAULT_PORT, workers: int = 8
+) -> PooledHTTPServer:
+    """
+    Opens the notebook at `db_path` and binds a server for it, run with `serve_forever()` and stop with `shutdown()`
+    then `server_close()`.
+    """
+    return PooledHTTPServer((host, port), NotebookStore(db_path), TokenStore(tokens_path), workers=workers)
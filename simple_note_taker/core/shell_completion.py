@@ -0,0 +1,123 @@
+"""
+Answers shell completion for note ids and tags from the completion cache without loading the app, which takes well over
+100ms just to import. Only needs the standard library, keep it that way: it runs on every TAB press.
+"""
+import json
+import os
+import shlex
+
+# same as config.snt_home_dir / "completion_cache.json", not imported from there as config is slow to import
+default_cache_path = os.path.join(os.path.expanduser("~"), ".simpleNoteTaker", "completion_cache.json")
+
+_NOTE_ID_COMMANDS = {"mark-done", "edit", "history", "revert", "delete"}
+_SHELLS = {"bash", "zsh", "fish", "powershell", "pwsh"}
+
+
+def empty_cache() -> dict:
+    # ids: {note id: [summary, tags]}, tags: {tag: number of notes with the tag}
+    return {"ids": {}, "tags": {}}
+
+
+def read_cache(cache_path: str) -> dict:
+    try:
+        with open(cache_path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return empty_cache()
+
+
+def note_id_choices(cache: dict, incomplete: str) -> list:
+    return [(doc_id, summary) for doc_id, (summary, _) in cache["ids"].items() if doc_id.startswith(incomplete)]
+
+
+def tag_choices(cache: dict, incomplete: str) -> list:
+    """
+    Tags are passed comma separated, so only the tag after the last comma is completed.
+    """
+    *previous_tags, current_tag = incomplete.split(",")
+    prefix = "".join(f"{tag}," for tag in previous_tags)
+    previous_tags = {tag.strip() for tag in previous_tags}
+    return [
+        prefix + tag
+        for tag in sorted(cache["tags"])
+        if tag.startswith(current_tag.strip()) and tag not in previous_tags
+    ]
+
+
+def _split_words(line: str) -> list:
+    try:
+        return shlex.split(line)
+    except ValueError:
+        # an unclosed quote while typing
+        return line.split()
+
+
+def _choices_function(args: list):
+    """
+    How to complete the argument after `args`, None if it isn't a note id or tags.
+    """
+    if not args or args[0].startswith("-"):
+        return None
+    command, command_args = args[0], args[1:]
+    after_tags_option = bool(command_args) and command_args[-1] == "--tags"
+    if command == "take":
+        return tag_choices if after_tags_option else None
+    if after_tags_option or any(not arg.startswith("-") for arg in command_args):
+        return None  # only the first argument of the other commands completes
+    if command in _NOTE_ID_COMMANDS:
+        return note_id_choices
+    if command == "match":
+        return tag_choices
+    return None
+
+
+def _args_and_incomplete(shell: str) -> tuple:
+    # read from the same environment variables as typer's completion scripts set
+    if shell == "bash":
+        words = _split_words(os.getenv("COMP_WORDS", ""))
+        cword = int(os.getenv("COMP_CWORD", 0))
+        return words[1:cword], words[cword] if cword < len(words) else ""
+    line = os.getenv("_TYPER_COMPLETE_ARGS", "")
+    args = _split_words(line)[1:]
+    if shell in {"powershell", "pwsh"}:
+        return args, os.getenv("_TYPER_COMPLETE_WORD_TO_COMPLETE", "")
+    if args and not line.endswith(" "):
+        return args[:-1], args[-1]
+    return args, ""
+
+
+def _zsh_escape(text: str) -> str:
+    return text.replace('"', '""').replace("'", "''").replace("$", "\\$").replace("`", "\\`")
+
+
+def _format_choices(shell: str, choices: list) -> list:
+    # the same output as typer gives for each shell
+    if shell == "bash":
+        return [item for item, _ in choices]
+    if shell == "zsh":
+        items = [f'"{_zsh_escape(item)}"' + (f':"{_zsh_escape(help)}"' if help else "") for item, help in choices]
+        return ["_arguments '*: :((" + "\n".join(items) + "))'"] if items else ["_files"]
+    if shell == "fish":
+        if os.getenv("_TYPER_COMPLETE_FISH_ACTION") == "is-args":
+            raise SystemExit(0 if choices else 1)
+        return [f"{item}\t{' '.join(help.split())}" if help else item for item, help in choices]
+    return [f"{item}:::{help or ' '}" for item, help in choices]
+
+
+def complete_from_cache(complete_instruction: str, cache_path: str = default_cache_path) -> bool:
+    """
+    Answers the completion request in `_SNT_COMPLETE` if it's for a note id or tags, returning True. Returns False for
+    anything else, commands, options or printing the completion script, which typer answers.
+    """
+    command, _, shell = complete_instruction.partition("_")
+    if command != "complete" or shell not in _SHELLS:
+        return False
+    args, incomplete = _args_and_incomplete(shell)
+    choices_function = _choices_function(args)
+    if choices_function is None:
+        return False
+
+    choices = [c if isinstance(c, tuple) else (c, "") for c in choices_function(read_cache(cache_path), incomplete)]
+    for line in _format_choices(shell, choices):
+        print(line)
+    return True
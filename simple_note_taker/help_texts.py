@@ -3,10 +3,36 @@ TAKE_NOTE_PROMPT = "Note content"
 TAKE_NOTE_TAGS_HELP = "Add tags separated by commas. e.g. test,long note,code"
 
 MATCH_TAGS_HELP = "Any tags you want to match. e.g. test,long note,code"
+GREP_PATTERN_HELP = "Regular expression to find in your notes. e.g. 'bins?' or '^todo'"
+GREP_FIELD_HELP = "Note field to match the pattern against"
+GREP_SINCE_HELP = "Only match notes taken within this timeframe. e.g. 2w3d"
+GREP_COUNT_HELP = "Only print the number of matching notes"
 LS_COUNT_HELP = "Number of notes to display, pass 0 to show all notes"
 EDIT_NOTE_ID_HELP = "Note ID to of note edit"
 DELETE_NOTE_ID_HELP = "Note ID to of note to delete"
+HISTORY_NOTE_ID_HELP = "Note ID to of note to show the edits of"
+REVERT_NOTE_ID_HELP = "Note ID to of note to revert"
+REVERT_REVISION_HELP = "Revision to revert to, as listed by `snt history`"
 
 # config Commands
 CONFIG_APP_HELP = "For interacting with configuration tooling"
 CONFIG_SET_USERNAME_PROMPT = "New username"
+CONFIG_SET_SERVER_URL_PROMPT = "Server url"
+CONFIG_SET_SERVER_TOKEN_PROMPT = "Token the server admin issued you"
+
+# remote Commands
+REMOTE_APP_HELP = "For taking and reading notes on a shared notebook server, see `snt serve`"
+REMOTE_SERVER_HELP = "Server url, defaults to server_url in the config. e.g. http://notes.example.com:8642"
+REMOTE_TOKEN_HELP = "Token issued by the server admin with `snt issue-token`, defaults to server_token in the config"
+REMOTE_SHARED_HELP = "Let other users of the server see this note, defaults to share_enabled in the config"
+REMOTE_TAG_HELP = "Only list notes with this tag"
+REMOTE_USER_HELP = "Only list notes taken by this user"
+
+# serve Command
+SERVE_DB_PATH_HELP = "Database file for the shared notebook, defaults to server_db_file_path in the config"
+SERVE_PORT_HELP = "Port to listen on, defaults to 8642"
+SERVE_WORKERS_HELP = "Number of worker threads handling requests"
+SERVE_TOKENS_PATH_HELP = "File of the tokens issued to users, defaults to server_tokens_file_path in the config"
+
+# issue-token Command
+ISSUE_TOKEN_USERNAME_HELP = "User to issue the token to, replaces any token they had before"
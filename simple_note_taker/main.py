@@ -1,27 +1,45 @@
-from typing import List, Optional
+import re
+from datetime import datetime, timedelta
+from enum import Enum
+from typing import List, Optional, Tuple
 
-import pkg_resources
 import typer
+from pytimeparse import parse
 
+from simple_note_taker.core.completion import complete_note_ids, complete_tags
 from simple_note_taker.core.config import config
 from simple_note_taker.core.notes import DATE_FORMAT, Note, NoteInDB, Notes
 from simple_note_taker.help_texts import *
 from simple_note_taker.subcommands.config import config_app
-
-_DISTRIBUTION_METADATA = pkg_resources.get_distribution("simple_note_taker")
-
-__version__ = _DISTRIBUTION_METADATA.version
+from simple_note_taker.subcommands.remote import remote_app
 
 app = typer.Typer(name="Simple Note Taker")
 app.add_typer(config_app, name="config")
+app.add_typer(remote_app, name="remote")
 
 
 def version_callback(value: bool):
     if value:
-        typer.echo(__version__)
+        import pkg_resources  # slow to import, keep it out of the startup path of every command and TAB press
+
+        typer.echo(pkg_resources.get_distribution("simple_note_taker").version)
         raise typer.Exit()
 
 
+class GrepField(str, Enum):
+    content = "content"
+    tags = "tags"
+    user = "user"
+
+
+def highlight(text: str, spans: List[Tuple[int, int]]) -> str:
+    highlighted, last_end = "", 0
+    for start, end in spans:
+        highlighted += text[last_end:start] + typer.style(text[start:end], fg=typer.colors.RED, bold=True)
+        last_end = end
+    return highlighted + text[last_end:]
+
+
 def print_notes(notes_to_print: List[NoteInDB]) -> None:
     for i, note in enumerate(notes_to_print):
         typer.secho(" - " + note.pretty_str())
@@ -43,7 +61,7 @@ def check_for_reminders(version: Optional[bool] = typer.Option(None, "--version"
 def take(
         note: str = typer.Option(..., prompt=TAKE_NOTE_PROMPT),
         private: bool = typer.Option(config.default_private),
-        tags: str = typer.Option("", help=TAKE_NOTE_TAGS_HELP)
+        tags: str = typer.Option("", help=TAKE_NOTE_TAGS_HELP, autocompletion=complete_tags)
 ):
     """
     Take a note and save it. Include any of the magic commands to execute their functionality.
@@ -73,7 +91,7 @@ def take(
 
 # Retrieval subcommands
 @app.command()
-def match(tags=typer.Argument(..., help=MATCH_TAGS_HELP)):
+def match(tags: str = typer.Argument(..., help=MATCH_TAGS_HELP, autocompletion=complete_tags)):
     """
     Search your notes you've tagged.
     """
@@ -90,6 +108,43 @@ def search(term: str, limit: int = typer.Argument(5)):
     print_notes(found_notes)
 
 
+@app.command()
+def grep(
+        pattern: str = typer.Argument(..., help=GREP_PATTERN_HELP),
+        field: GrepField = typer.Option(GrepField.content, help=GREP_FIELD_HELP),
+        since: str = typer.Option(None, help=GREP_SINCE_HELP),
+        count: bool = typer.Option(False, help=GREP_COUNT_HELP),
+):
+    """
+    Find notes matching a regular expression, case insensitive.
+    """
+    try:
+        compiled_pattern = re.compile(pattern, flags=re.IGNORECASE)
+    except re.error as e:
+        raise typer.BadParameter(f"Invalid pattern: {e}")
+
+    since_date = None
+    if since is not None:
+        since_seconds = parse(since)
+        if since_seconds is None:
+            raise typer.BadParameter(f'Could not read a timeframe from "{since}", try something like 2w3d')
+        since_date = datetime.now() - timedelta(seconds=since_seconds)
+
+    if count:
+        found_count = Notes.grep_count(compiled_pattern, field.value, since_date)
+    else:
+        found_count = 0
+        for note, matches in Notes.grep(compiled_pattern, field.value, since_date):
+            found_count += 1
+            if field == GrepField.content:
+                typer.secho(" - " + note.pretty_str(content=highlight(*matches[0])))
+            else:
+                highlighted_values = ", ".join(highlight(value, spans) for value, spans in matches)
+                typer.secho(f" - {note.pretty_str()} | {field.value}: {highlighted_values}")
+
+    typer.secho(f'Found {found_count} notes with {field.value} matching "{pattern}"')
+
+
 @app.command()
 def ls(count: int = typer.Argument(10, help=LS_COUNT_HELP)):
     """
@@ -117,7 +172,7 @@ def tasks(include_complete: bool = typer.Option(False), count: int = typer.Argum
 
 
 @app.command()
-def mark_done(note_id: int = typer.Argument(...)):
+def mark_done(note_id: int = typer.Argument(..., autocompletion=complete_note_ids)):
     """
     Mark a task type note as done.
     """
@@ -142,7 +197,7 @@ def size():
 
 
 @app.command()
-def edit(note_id: int = typer.Argument(..., help=EDIT_NOTE_ID_HELP)):
+def edit(note_id: int = typer.Argument(..., help=EDIT_NOTE_ID_HELP, autocompletion=complete_note_ids)):
     """
     Edit a note you've taken.
     """
@@ -158,9 +213,49 @@ def edit(note_id: int = typer.Argument(..., help=EDIT_NOTE_ID_HELP)):
         raise typer.Abort()
 
 
+@app.command()
+def history(note_id: int = typer.Argument(..., help=HISTORY_NOTE_ID_HELP, autocompletion=complete_note_ids)):
+    """
+    List every revision of a note you've edited.
+    """
+    note = Notes.get_by_id(note_id)
+    if note is None:
+        typer.secho(f"No note of ID {note_id} found.")
+        raise typer.Abort()
+
+    revisions, warning = note.revisions()
+    if warning is not None:
+        typer.secho(warning, fg=typer.colors.YELLOW)
+    typer.secho(f"Note {note_id} has {len(revisions)} revisions", bold=True, underline=True)
+    for i, (revision, revised_at, content) in enumerate(revisions):
+        current_str = " (current)" if i == len(revisions) - 1 else ""
+        revised_at_str = revised_at.strftime(DATE_FORMAT) if revised_at is not None else "outside of snt"
+        typer.secho(f" - Rev {revision}: {revised_at_str} | {content}{current_str}")
+
+
+@app.command()
+def revert(
+        note_id: int = typer.Argument(..., help=REVERT_NOTE_ID_HELP, autocompletion=complete_note_ids),
+        revision: int = typer.Argument(..., help=REVERT_REVISION_HELP),
+):
+    """
+    Set a note back to an earlier revision, the revert is saved as a new revision.
+    """
+    note = Notes.get_by_id(note_id)
+    if note is None:
+        typer.secho(f"No note of ID {note_id} found.")
+        raise typer.Abort()
+
+    if not note.revert(revision):
+        typer.secho(f"Note {note_id} has no revision {revision}.")
+        raise typer.Abort()
+    typer.secho(f"Note {note_id} reverted to revision {revision}.")
+    typer.secho(note.pretty_str())
+
+
 @app.command()
 def delete(
-        note_id: int = typer.Argument(..., help=DELETE_NOTE_ID_HELP),
+        note_id: int = typer.Argument(..., help=DELETE_NOTE_ID_HELP, autocompletion=complete_note_ids),
         force: bool = typer.Option(False),
 ):
     """
@@ -177,5 +272,65 @@ def delete(
         raise typer.Abort()
 
 
+# Maintenance
+@app.command()
+def reindex():
+    """
+    Rebuild the saved search fields and completion cache of your notes. Run once on notebooks taken with older
+    versions, until then their note ids and tags don't TAB complete.
+    """
+    reindexed = Notes.reindex()
+    typer.secho(f"Reindexed {reindexed} notes.")
+
+
+# Sharing
+@app.command()
+def serve(
+        host: str = typer.Option("127.0.0.1"),
+        port: int = typer.Option(None, help=SERVE_PORT_HELP),
+        workers: int = typer.Option(8, help=SERVE_WORKERS_HELP),
+        db_path: str = typer.Option(None, help=SERVE_DB_PATH_HELP),
+        tokens_path: str = typer.Option(None, help=SERVE_TOKENS_PATH_HELP),
+):
+    """
+    Host a shared notebook for a team, use `snt remote` to take and read notes on it.
+    Issue each user a token with `snt issue-token`, requests without one can only read shared notes.
+    """
+    # the server pulls in http.server and friends, only import them when serving
+    from simple_note_taker.core.server import DEFAULT_PORT, create_server
+
+    server = create_server(
+        db_path or config.server_db_file_path,
+        tokens_path or config.server_tokens_file_path,
+        host=host,
+        port=DEFAULT_PORT if port is None else port,
+        workers=workers,
+    )
+    if not server.socket.getsockname()[0].startswith("127."):
+        typer.secho("Tokens are sent in plain http, put a TLS proxy in front of servers reachable off this machine.")
+    typer.secho(f"Serving shared notebook on http://{host}:{server.server_port}, Ctrl-C to stop.")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        typer.secho("Stopping, flushing notes to disk...")
+    finally:
+        server.server_close()
+
+
+@app.command()
+def issue_token(
+        username: str = typer.Argument(..., help=ISSUE_TOKEN_USERNAME_HELP),
+        tokens_path: str = typer.Option(None, help=SERVE_TOKENS_PATH_HELP),
+):
+    """
+    Issue a token for a user of `snt serve`. Only a hash is kept, so pass it on now, it can't be shown again.
+    """
+    from simple_note_taker.core.server import TokenStore
+
+    token = TokenStore(tokens_path or config.server_tokens_file_path).issue(username)
+    typer.secho(f"Token for {username}, set it with `snt config set-server`:")
+    typer.secho(token, bold=True)
+
+
 if __name__ == "__main__":
     app()
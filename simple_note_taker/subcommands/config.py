@@ -8,7 +8,12 @@ from simple_note_taker.core.config import (
     config_file_path,
     write_config_to_file,
 )
-from simple_note_taker.help_texts import CONFIG_APP_HELP, CONFIG_SET_USERNAME_PROMPT
+from simple_note_taker.help_texts import (
+    CONFIG_APP_HELP,
+    CONFIG_SET_SERVER_TOKEN_PROMPT,
+    CONFIG_SET_SERVER_URL_PROMPT,
+    CONFIG_SET_USERNAME_PROMPT,
+)
 
 config_app = typer.Typer(help=CONFIG_APP_HELP)
 
@@ -52,6 +57,20 @@ def set_username(username: str = typer.Option(..., prompt=CONFIG_SET_USERNAME_PR
     typer.secho(f"Updated username to: {config.username}")
 
 
+@config_app.command()
+def set_server(
+        url: str = typer.Option(..., prompt=CONFIG_SET_SERVER_URL_PROMPT),
+        token: str = typer.Option(..., prompt=CONFIG_SET_SERVER_TOKEN_PROMPT, hide_input=True),
+):
+    """
+    Sets the shared notebook server `snt remote` uses, along with the token its admin issued you.
+    """
+    config.server_url = url
+    config.server_token = token
+    write_config_to_file(config)
+    typer.secho(f"Updated server to: {config.server_url}")
+
+
 @config_app.command()
 def enable_sharing():
     """
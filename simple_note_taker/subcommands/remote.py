@@ -0,0 +1,95 @@
+from typing import TYPE_CHECKING, Callable, List, TypeVar
+
+import typer
+
+from simple_note_taker.core.config import config
+from simple_note_taker.core.notes import NoteInDB
+from simple_note_taker.help_texts import (
+    DELETE_NOTE_ID_HELP,
+    LS_COUNT_HELP,
+    REMOTE_APP_HELP,
+    REMOTE_SERVER_HELP,
+    REMOTE_SHARED_HELP,
+    REMOTE_TAG_HELP,
+    REMOTE_TOKEN_HELP,
+    REMOTE_USER_HELP,
+    TAKE_NOTE_PROMPT,
+    TAKE_NOTE_TAGS_HELP,
+)
+
+if TYPE_CHECKING:
+    from simple_note_taker.core.client import RemoteNotebook
+
+remote_app = typer.Typer(help=REMOTE_APP_HELP)
+
+T = TypeVar("T")
+
+
+def _call_remote(server: str, token: str, action: Callable[["RemoteNotebook"], T]) -> T:
+    # http.client is slow to import, keep it out of the startup path of every other command
+    from simple_note_taker.core.client import RemoteNotebook, RemoteNotebookError
+
+    server = server or config.server_url
+    if server is None:
+        typer.secho("No server set, pass --server or set one with `snt config set-server`.")
+        raise typer.Abort()
+    try:
+        notebook = RemoteNotebook(server, token=token or config.server_token)
+        try:
+            return action(notebook)
+        finally:
+            notebook.close()
+    except RemoteNotebookError as e:
+        typer.secho(str(e))
+        raise typer.Abort()
+
+
+def _print_notes(notes_to_print: List[NoteInDB]) -> None:
+    for note in notes_to_print:
+        typer.secho(f" - {note.pretty_str()} | {note.user}")
+
+
+@remote_app.command()
+def take(
+        note: str = typer.Option(..., prompt=TAKE_NOTE_PROMPT),
+        private: bool = typer.Option(config.default_private),
+        shared: bool = typer.Option(config.share_enabled, help=REMOTE_SHARED_HELP),
+        tags: str = typer.Option("", help=TAKE_NOTE_TAGS_HELP),
+        server: str = typer.Option(None, help=REMOTE_SERVER_HELP),
+        token: str = typer.Option(None, help=REMOTE_TOKEN_HELP),
+):
+    """
+    Take a note on the shared notebook server. Magic commands work the same as for local notes.
+    """
+    tags_list = [t.strip() for t in tags.split(",") if t.strip()]
+    saved = _call_remote(server, token, lambda n: n.take(note.strip(), tags_list, private=private, shared=shared))
+    typer.secho(f"{'Task' if saved.task else 'Note'} saved on the server with id {saved.doc_id}.")
+
+
+@remote_app.command()
+def ls(
+        count: int = typer.Argument(10, help=LS_COUNT_HELP),
+        tag: str = typer.Option(None, help=REMOTE_TAG_HELP),
+        user: str = typer.Option(None, help=REMOTE_USER_HELP),
+        server: str = typer.Option(None, help=REMOTE_SERVER_HELP),
+        token: str = typer.Option(None, help=REMOTE_TOKEN_HELP),
+):
+    """
+    Fetch the latest notes on the shared notebook server you can see.
+    """
+    notes = _call_remote(server, token, lambda n: n.notes(tag=tag, user=user, limit=count))
+    typer.secho(f"Last {len(notes)} notes", bold=True, underline=True)
+    _print_notes(notes)
+
+
+@remote_app.command()
+def delete(
+        note_id: int = typer.Argument(..., help=DELETE_NOTE_ID_HELP),
+        server: str = typer.Option(None, help=REMOTE_SERVER_HELP),
+        token: str = typer.Option(None, help=REMOTE_TOKEN_HELP),
+):
+    """
+    Delete one of your notes from the shared notebook server.
+    """
+    _call_remote(server, token, lambda n: n.delete(note_id))
+    typer.secho(f"Note under ID {note_id} deleted from the server.")
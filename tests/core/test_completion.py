@@ -0,0 +1,100 @@
+import io
+import os
+import tempfile
+from contextlib import redirect_stdout
+from pathlib import Path
+from unittest import TestCase
+from unittest.mock import patch
+
+from simple_note_taker.core.completion import (
+    cache_note,
+    complete_note_ids,
+    complete_tags,
+    rebuild_completion_cache,
+    uncache_note,
+)
+from simple_note_taker.core.shell_completion import complete_from_cache
+
+test_cache_dir = tempfile.TemporaryDirectory()
+test_cache_path = Path(test_cache_dir.name) / "completion_cache.json"
+
+
+class TestCompletion(TestCase):
+    def setUp(self) -> None:
+        # patched here rather than on the class so setUp doesn't write to the real cache
+        cache_path_patcher = patch("simple_note_taker.core.completion.completion_cache_path", new=test_cache_path)
+        cache_path_patcher.start()
+        self.addCleanup(cache_path_patcher.stop)
+        rebuild_completion_cache([])
+
+    def test_complete_note_ids(self):
+        cache_note(1, "take out the bins", [])
+        cache_note(12, "make dinner", [])
+        cache_note(2, "a very long note which will not fit in the completion help text", [])
+        self.assertEqual([("1", "take out the bins"), ("12", "make dinner")], complete_note_ids("1"))
+        self.assertEqual([("2", "a very long note which will not fit i...")], complete_note_ids("2"))
+
+    def test_uncache_note(self):
+        cache_note(1, "note one", ["home"])
+        cache_note(2, "note two", ["home", "work"])
+        uncache_note(2)
+        self.assertEqual(["1"], [doc_id for doc_id, _ in complete_note_ids("")])
+        self.assertEqual(["home"], complete_tags(""))
+
+    def test_complete_tags(self):
+        cache_note(1, "note one", ["home", "homework", "work"])
+        self.assertEqual(["home", "homework"], complete_tags("ho"))
+        self.assertEqual(["home,homework"], complete_tags("home,ho"))
+
+    def test_missing_cache_completes_nothing(self):
+        test_cache_path.unlink()
+        self.assertEqual([], complete_note_ids(""))
+        self.assertEqual([], complete_tags(""))
+
+    def test_cache_write_failure_ignored(self):
+        with patch("simple_note_taker.core.completion._write_cache", side_effect=OSError):
+            cache_note(1, "note one", [])
+            uncache_note(1)
+
+
+class TestShellCompletion(TestCase):
+    def setUp(self) -> None:
+        cache_path_patcher = patch("simple_note_taker.core.completion.completion_cache_path", new=test_cache_path)
+        cache_path_patcher.start()
+        self.addCleanup(cache_path_patcher.stop)
+        rebuild_completion_cache([])
+        cache_note(1, "take out the bins", ["home"])
+        cache_note(12, 'make "dinner"', ["home", "work"])
+
+    def _complete(self, instruction: str, **env) -> str:
+        stdout = io.StringIO()
+        with patch.dict(os.environ, env), redirect_stdout(stdout):
+            self.assertTrue(complete_from_cache(instruction, cache_path=str(test_cache_path)))
+        return stdout.getvalue()
+
+    def test_zsh_note_ids(self):
+        self.assertEqual(
+            '_arguments \'*: :(("1":"take out the bins"\n"12":"make ""dinner"""))\'\n',
+            self._complete("complete_zsh", _TYPER_COMPLETE_ARGS="snt delete --force "),
+        )
+        self.assertEqual("_files\n", self._complete("complete_zsh", _TYPER_COMPLETE_ARGS="snt edit 3"))
+
+    def test_bash_tags(self):
+        self.assertEqual("home\n", self._complete("complete_bash", COMP_WORDS="snt take --tags ho", COMP_CWORD="3"))
+        self.assertEqual("home,work\n", self._complete("complete_bash", COMP_WORDS="snt match home,", COMP_CWORD="2"))
+
+    def test_fish_and_powershell(self):
+        env = dict(_TYPER_COMPLETE_ARGS="snt history 1", _TYPER_COMPLETE_FISH_ACTION="get-args")
+        self.assertEqual('1\ttake out the bins\n12\tmake "dinner"\n', self._complete("complete_fish", **env))
+        env = dict(_TYPER_COMPLETE_ARGS="snt history", _TYPER_COMPLETE_WORD_TO_COMPLETE="12")
+        self.assertEqual('12:::make "dinner"\n', self._complete("complete_powershell", **env))
+
+    def test_left_to_typer(self):
+        for instruction, words in [
+            ("complete_zsh", "snt de"),  # command names
+            ("complete_zsh", "snt revert 1 "),  # revision numbers
+            ("complete_zsh", "snt take --no"),  # options
+            ("source_zsh", "snt delete "),  # printing the completion script
+        ]:
+            with patch.dict(os.environ, _TYPER_COMPLETE_ARGS=words):
+                self.assertFalse(complete_from_cache(instruction, cache_path=str(test_cache_path)), words)
@@ -0,0 +1,163 @@
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from unittest import TestCase
+from unittest.mock import patch
+
+from tinydb import TinyDB
+from tinydb.storages import MemoryStorage
+
+from simple_note_taker.core.database import (
+    AtomicJSONStorage,
+    CoalescingMiddleware,
+    DatabaseCorruptedError,
+    write_lock,
+)
+
+# takes notes like `snt take` does, opening the database for each one
+_TAKE_NOTES = """
+import sys
+from tinydb import TinyDB
+from simple_note_taker.core.database import AtomicJSONStorage, write_lock
+
+for i in range(int(sys.argv[2])):
+    db = TinyDB(sys.argv[1], storage=AtomicJSONStorage)
+    with write_lock(db):
+        db.table("notes").insert({"content": f"note {i}"})
+"""
+
+
+class TestAtomicJSONStorage(TestCase):
+    def setUp(self) -> None:
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.db_path = str(Path(self.tmp_dir.name) / "database.json")
+
+    def tearDown(self) -> None:
+        self.tmp_dir.cleanup()
+
+    def test_round_trip(self):
+        db = TinyDB(self.db_path, storage=AtomicJSONStorage)
+        db.table("notes").insert({"content": "note one"})
+        db.table("notes").insert({"content": "note two"})
+        assert [n["content"] for n in TinyDB(self.db_path, storage=AtomicJSONStorage).table("notes").all()] == [
+            "note one",
+            "note two",
+        ]
+        assert sorted(os.listdir(self.tmp_dir.name)) == ["database.json", "database.json.lock", "database.json.sha256"]
+
+    def test_database_stays_plain_json(self):
+        TinyDB(self.db_path, storage=AtomicJSONStorage).table("notes").insert({"content": "note one"})
+        with open(self.db_path) as f:
+            saved = json.load(f)
+        assert saved == {"notes": {"1": {"content": "note one"}}}
+        with open(f"{self.db_path}.sha256") as f:
+            assert len(json.load(f)[0]) == 64
+
+    def test_corruption_detected(self):
+        TinyDB(self.db_path, storage=AtomicJSONStorage).table("notes").insert({"content": "note one"})
+        with open(self.db_path) as f:
+            contents = f.read()
+        with open(self.db_path, "w") as f:
+            f.write(contents.replace("note one", "note 1"))
+        with self.assertRaises(DatabaseCorruptedError):
+            TinyDB(self.db_path, storage=AtomicJSONStorage).table("notes").all()
+        os.remove(f"{self.db_path}.sha256")
+        assert TinyDB(self.db_path, storage=AtomicJSONStorage).table("notes").get(doc_id=1)["content"] == "note 1"
+
+    def test_reads_database_without_checksum(self):
+        with open(self.db_path, "w") as f:
+            json.dump({"notes": {"1": {"content": "old note"}}}, f)
+        assert TinyDB(self.db_path, storage=AtomicJSONStorage).table("notes").get(doc_id=1)["content"] == "old note"
+
+    def test_interrupted_write_keeps_database(self):
+        db = TinyDB(self.db_path, storage=AtomicJSONStorage)
+        db.table("notes").insert({"content": "note one"})
+        with patch("os.replace", side_effect=KeyboardInterrupt):
+            with self.assertRaises(KeyboardInterrupt):
+                db.table("notes").insert({"content": "note two"})
+        assert len(TinyDB(self.db_path, storage=AtomicJSONStorage).table("notes").all()) == 1
+        assert sorted(os.listdir(self.tmp_dir.name)) == ["database.json", "database.json.lock", "database.json.sha256"]
+
+    def test_interrupted_after_checksum_written(self):
+        db = TinyDB(self.db_path, storage=AtomicJSONStorage)
+        db.table("notes").insert({"content": "note one"})
+        replace, replaced = os.replace, []
+
+        def replace_checksum_only(src, dst):
+            if replaced:
+                raise KeyboardInterrupt
+            replaced.append(dst)
+            replace(src, dst)
+
+        with patch("os.replace", side_effect=replace_checksum_only):
+            with self.assertRaises(KeyboardInterrupt):
+                db.table("notes").insert({"content": "note two"})
+        assert replaced == [f"{self.db_path}.sha256"]
+        assert len(TinyDB(self.db_path, storage=AtomicJSONStorage).table("notes").all()) == 1
+
+    def test_processes_writing_at_once(self):
+        TinyDB(self.db_path, storage=AtomicJSONStorage).table("notes").insert({"content": "first note"})
+        package_root = str(Path(__file__).parents[2])
+        processes = [
+            subprocess.Popen(
+                [sys.executable, "-c", _TAKE_NOTES, self.db_path, "5"],
+                env={**os.environ, "PYTHONPATH": package_root},
+            )
+            for _ in range(8)
+        ]
+        assert [p.wait(timeout=60) for p in processes] == [0] * 8
+        assert len(TinyDB(self.db_path, storage=AtomicJSONStorage).table("notes").all()) == 41
+
+    def test_write_lock_shared_by_storages(self):
+        db = TinyDB(self.db_path, storage=AtomicJSONStorage)
+        with write_lock(db):
+            TinyDB(self.db_path, storage=AtomicJSONStorage).table("notes").insert({"content": "note one"})
+        assert len(db.table("notes").all()) == 1
+
+    def test_symlink_kept(self):
+        target_path = str(Path(self.tmp_dir.name) / "synced" / "notes.json")
+        os.mkdir(os.path.dirname(target_path))
+        TinyDB(target_path, storage=AtomicJSONStorage).table("notes").insert({"content": "note one"})
+        os.symlink(target_path, self.db_path)
+
+        TinyDB(self.db_path, storage=AtomicJSONStorage).table("notes").insert({"content": "note two"})
+        assert os.path.islink(self.db_path)
+        assert len(TinyDB(target_path, storage=AtomicJSONStorage).table("notes").all()) == 2
+        assert os.path.exists(f"{target_path}.sha256")
+
+    def test_mode_kept(self):
+        TinyDB(self.db_path, storage=AtomicJSONStorage).table("notes").insert({"content": "note one"})
+        os.chmod(self.db_path, 0o640)
+        TinyDB(self.db_path, storage=AtomicJSONStorage).table("notes").insert({"content": "note two"})
+        assert os.stat(self.db_path).st_mode & 0o777 == 0o640
+
+
+class TestCoalescingMiddleware(TestCase):
+    def test_writes_coalesced(self):
+        db = TinyDB(storage=CoalescingMiddleware(MemoryStorage, window=0.05))
+        with patch.object(MemoryStorage, "write", autospec=True, side_effect=MemoryStorage.write) as write:
+            for i in range(10):
+                db.table("notes").insert({"content": f"note {i}"})
+            assert len(db.table("notes").all()) == 10  # pending writes are readable before the flush
+            time.sleep(0.2)
+            assert write.call_count == 1
+        db.close()
+
+    def test_flush_on_close(self):
+        db = TinyDB(storage=CoalescingMiddleware(MemoryStorage, window=60))
+        memory_storage = db.storage.storage
+        db.table("notes").insert({"content": "note one"})
+        assert memory_storage.read() is None
+        db.close()
+        assert len(memory_storage.read()["notes"]) == 1
+
+    def test_failed_flush_raised(self):
+        db = TinyDB(storage=CoalescingMiddleware(MemoryStorage, window=60))
+        db.table("notes").insert({"content": "note one"})
+        with patch.object(MemoryStorage, "write", side_effect=OSError("disk full")):
+            with self.assertRaises(OSError):
+                db.close()
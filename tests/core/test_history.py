@@ -0,0 +1,104 @@
+import tempfile
+from datetime import datetime
+from pathlib import Path
+from unittest import TestCase
+from unittest.mock import patch
+
+from simple_note_taker.core.history import (
+    _apply_delta,
+    _append,
+    _crc,
+    _delta,
+    note_revisions,
+    record_deletion,
+    record_revision,
+)
+
+test_history_dir = tempfile.TemporaryDirectory()
+test_history_path = Path(test_history_dir.name) / "history.jsonl"
+
+
+class TestDelta(TestCase):
+    def test_round_trip(self):
+        for old, new in [
+            ("take out the bins", "take out the bins on tuesday"),
+            ("take out the bins on tuesday", "bins"),
+            ("", "something"),
+            ("something", ""),
+            ("same", "same"),
+        ]:
+            self.assertEqual(old, _apply_delta(new, _delta(new, old)))
+
+    def test_small_edit_small_delta(self):
+        long_note = "a long note which goes on and on " * 50
+        self.assertLess(len(_delta(long_note + " edited", long_note)), len(long_note) / 10)
+
+
+@patch("simple_note_taker.core.history.history_file_path", new=test_history_path)
+class TestHistory(TestCase):
+    def setUp(self) -> None:
+        test_history_path.write_text("")
+
+    def test_revisions(self):
+        taken_at = datetime(2021, 1, 1)
+        record_revision("notes", 1, "first", "second")
+        record_revision("notes", 2, "other note", "other note edited")
+        record_revision("notes", 1, "second", "third")
+        revisions, warning = note_revisions("notes", 1, "third", taken_at)
+        self.assertEqual([(0, "first"), (1, "second"), (2, "third")], [(rev, c) for rev, _, c in revisions])
+        self.assertEqual(taken_at, revisions[0][1])
+        self.assertIsNone(warning)
+
+    def test_no_revisions(self):
+        self.assertEqual(
+            ([(0, datetime(2021, 1, 1), "first")], None), note_revisions("notes", 1, "first", datetime(2021, 1, 1))
+        )
+
+    def test_notebooks_kept_apart(self):
+        record_revision("notes", 1, "first", "second")
+        record_revision("work", 1, "work note", "work note edited")
+        revisions, warning = note_revisions("work", 1, "work note edited", datetime(2021, 1, 1))
+        self.assertEqual(["work note", "work note edited"], [c for _, _, c in revisions])
+        self.assertIsNone(warning)
+
+    def test_records_without_notebook_are_default_notebook(self):
+        _append({"note_id": 1, "at": "2021-01-02T00:00:00.000000", "crc": _crc("two"), "delta": _delta("two", "one")})
+        revisions, _ = note_revisions("notes", 1, "two", datetime(2021, 1, 1))
+        self.assertEqual(["one", "two"], [c for _, _, c in revisions])
+        self.assertEqual(1, len(note_revisions("work", 1, "two", datetime(2021, 1, 1))[0]))
+
+    def test_deleted_note_history_not_reused(self):
+        record_revision("notes", 1, "first", "second")
+        record_deletion("notes", 1)
+        self.assertEqual(1, len(note_revisions("notes", 1, "a new note with a reused id", datetime(2021, 1, 1))[0]))
+
+    def test_unsaved_edits_skipped(self):
+        # edits to second and third were recorded but the database still had first when they were lost
+        record_revision("notes", 1, "first", "second")
+        record_revision("notes", 1, "second", "third")
+        record_revision("notes", 1, "first", "fourth")
+        revisions, warning = note_revisions("notes", 1, "fourth", datetime(2021, 1, 1))
+        self.assertEqual([(0, "first"), (3, "fourth")], [(rev, c) for rev, _, c in revisions])
+        self.assertIsNone(warning)
+
+    def test_latest_edit_unsaved(self):
+        record_revision("notes", 1, "first", "second")
+        record_revision("notes", 1, "second", "third")
+        revisions, warning = note_revisions("notes", 1, "second", datetime(2021, 1, 1))
+        self.assertEqual([(0, "first"), (1, "second")], [(rev, c) for rev, _, c in revisions])
+        self.assertIsNone(warning)
+
+    def test_mismatched_content(self):
+        record_revision("notes", 1, "first", "second")
+        revisions, warning = note_revisions("notes", 1, "changed outside of snt", datetime(2021, 1, 1))
+        self.assertEqual([(2, None, "changed outside of snt")], revisions)
+        self.assertIn("changed outside of snt", warning)
+        self.assertIn("before revision 2", warning)
+
+    def test_mismatch_keeps_later_revisions(self):
+        record_revision("notes", 1, "first", "second")
+        record_revision("notes", 1, "hand edited", "third")
+        record_revision("notes", 1, "third", "fourth")
+        revisions, warning = note_revisions("notes", 1, "fourth", datetime(2021, 1, 1))
+        self.assertEqual([(2, "third"), (3, "fourth")], [(rev, c) for rev, _, c in revisions])
+        self.assertIn("before revision 2", warning)
@@ -1,5 +1,7 @@
 import re
+import tempfile
 from datetime import datetime, timedelta
+from pathlib import Path
 from unittest import TestCase
 from unittest.mock import patch
 
@@ -8,7 +10,7 @@ from tinydb.storages import MemoryStorage
 from tinydb_serialization import SerializationMiddleware
 from tinydb_serialization.serializers import DateTimeSerializer
 
-from simple_note_taker.core.notes import Note
+from simple_note_taker.core.notes import Note, Notes
 
 _serialization = SerializationMiddleware(MemoryStorage)
 _serialization.register_serializer(DateTimeSerializer(), "TinyDate")
@@ -16,8 +18,13 @@ _serialization.register_serializer(DateTimeSerializer(), "TinyDate")
 test_db = TinyDB(storage=_serialization)
 notes_db = test_db.table("notes")
 
+test_cache_dir = tempfile.TemporaryDirectory()
+test_cache_path = Path(test_cache_dir.name) / "completion_cache.json"
+test_history_path = Path(test_cache_dir.name) / "history.jsonl"
 
-@patch("simple_note_taker.core.notes._notes_db", new=notes_db)
+
+@patch("simple_note_taker.core.notes.get_tiny_db", new=lambda: test_db)
+@patch("simple_note_taker.core.completion.completion_cache_path", new=test_cache_path)
 class TestNoteModelDBInteractions(TestCase):
     def setUp(self) -> None:
         notes_db.truncate()
@@ -29,7 +36,8 @@ class TestNoteModelDBInteractions(TestCase):
         self.assertEqual(1, len(notes_db.all()))
 
 
-@patch("simple_note_taker.core.notes._notes_db", new=notes_db)
+@patch("simple_note_taker.core.notes.get_tiny_db", new=lambda: test_db)
+@patch("simple_note_taker.core.completion.completion_cache_path", new=test_cache_path)
 class TestNoteModel(TestCase):
     def setUp(self) -> None:
         notes_db.truncate()
@@ -57,3 +65,39 @@ class TestNoteModel(TestCase):
         note = Note("please remindMe in 2d4h to do something").save()
         assert note.task is False
         assert note.reminder is None
+
+
+@patch("simple_note_taker.core.notes.get_tiny_db", new=lambda: test_db)
+@patch("simple_note_taker.core.completion.completion_cache_path", new=test_cache_path)
+@patch("simple_note_taker.core.history.history_file_path", new=test_history_path)
+class TestNoteSearchTokens(TestCase):
+    def setUp(self) -> None:
+        notes_db.truncate()
+
+    def test_search_tokens_saved(self):
+        note = Note("Take out the Bins, then the bins again", tags=["Chores", "home"]).save()
+        assert notes_db.get(doc_id=note.doc_id)["search_tokens"] == ["again", "bins", "out", "take", "the", "then"]
+        assert "search_tokens" not in note.dict()
+
+    def test_search_tokens_updated(self):
+        note = Note("first content").save()
+        note.content = "Second Content"
+        note.update()
+        assert notes_db.get(doc_id=note.doc_id)["search_tokens"] == ["content", "second"]
+
+    def test_search_uses_search_tokens(self):
+        Note("Take out the bins").save()
+        Note("Make dinner").save()
+        found = Notes.search("BINS")
+        assert found[0].content == "Take out the bins"
+
+    def test_find_match_tags(self):
+        Note("tagged note", tags=["Chores"]).save()
+        Note("other note", tags=["work"]).save()
+        found = Notes.find_match("^chore", "tags")
+        assert [n.content for n in found] == ["tagged note"]
+
+    def test_reindex_backfills_old_notes(self):
+        notes_db.insert(Note("An old note").dict())
+        assert Notes.reindex() == 1
+        assert notes_db.all()[0]["search_tokens"] == ["an", "note", "old"]
@@ -0,0 +1,196 @@
+import json
+import socket
+import tempfile
+import threading
+import time
+from http.client import HTTPConnection
+from pathlib import Path
+from unittest import TestCase
+
+from simple_note_taker.core.client import RemoteNotebook, RemoteNotebookError
+from simple_note_taker.core.server import NotebookStore, TokenStore, create_server
+
+
+class TestNotebookServer(TestCase):
+    def setUp(self) -> None:
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.db_path = str(Path(self.tmp_dir.name) / "server_database.json")
+        self.tokens_path = str(Path(self.tmp_dir.name) / "server_tokens.json")
+        self._start_server(workers=4)
+        self.alice_token = self.server.tokens.issue("alice")
+        self.alice = RemoteNotebook(self.server_url, token=self.alice_token)
+        self.bob = RemoteNotebook(self.server_url, token=self.server.tokens.issue("bob"))
+
+    def _start_server(self, workers: int):
+        self.server = create_server(self.db_path, self.tokens_path, port=0, workers=workers)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.server_url = f"http://127.0.0.1:{self.server.server_port}"
+
+    def tearDown(self) -> None:
+        self.alice.close()
+        self.bob.close()
+        self.server.shutdown()
+        self.server.server_close()
+        self.tmp_dir.cleanup()
+
+    def test_take_and_get(self):
+        note = self.alice.take("shared note !task", ["work"], shared=True)
+        assert note.doc_id == 1
+        assert note.user == "alice"
+        assert note.task is True
+        assert self.bob.get(note.doc_id).content == "shared note !task"
+
+    def test_visibility(self):
+        self.alice.take("shared note", ["work"], shared=True)
+        self.alice.take("unshared note", ["work"], shared=False)
+        self.alice.take("private note", ["work"], private=True)
+        assert len(self.alice.notes()) == 3
+        assert [n.content for n in self.bob.notes()] == ["shared note"]
+        assert self.bob.get(2) is None
+
+    def test_filters(self):
+        self.alice.take("alice work", ["work"], shared=True)
+        self.alice.take("alice home", ["home"], shared=True)
+        self.bob.take("bob work", ["work"], shared=True)
+        assert {n.content for n in self.bob.notes(tag="work")} == {"alice work", "bob work"}
+        assert [n.content for n in self.bob.notes(user="alice", tag="home")] == ["alice home"]
+        assert len(self.bob.notes(limit=2)) == 2
+
+    def test_delete_own_notes_only(self):
+        note = self.alice.take("alice note")
+        with self.assertRaises(RemoteNotebookError):
+            self.bob.delete(note.doc_id)
+        self.alice.delete(note.doc_id)
+        assert self.alice.notes() == []
+
+    def test_unknown_token_rejected(self):
+        self.alice.take("unshared note", shared=False)
+        impostor = RemoteNotebook(self.server_url, token="alice")
+        with self.assertRaises(RemoteNotebookError) as e:
+            impostor.notes()
+        assert e.exception.status == 401
+        impostor.close()
+
+    def test_anonymous_read_only(self):
+        self.alice.take("shared note", shared=True)
+        self.alice.take("unshared note", shared=False)
+        anonymous = RemoteNotebook(self.server_url, token=None)
+        assert [n.content for n in anonymous.notes()] == ["shared note"]
+        with self.assertRaises(RemoteNotebookError) as e:
+            anonymous.take("anonymous note")
+        assert e.exception.status == 401
+        anonymous.close()
+
+    def test_reissued_token_replaces_old(self):
+        new_token = self.server.tokens.issue("alice")
+        with self.assertRaises(RemoteNotebookError) as e:
+            self.alice.notes()
+        assert e.exception.status == 401
+        assert self.server.tokens.username(new_token) == "alice"
+        assert TokenStore(self.tokens_path).username(new_token) == "alice"
+        assert self.alice_token not in Path(self.tokens_path).read_text()
+
+    def test_non_object_body_rejected(self):
+        connection = HTTPConnection("127.0.0.1", self.server.server_port, timeout=5)
+        connection.request("POST", "/notes", body="[1]", headers={"Authorization": f"Bearer {self.alice_token}"})
+        response = connection.getresponse()
+        assert response.status == 400
+        assert "error" in json.loads(response.read())
+        connection.close()
+
+    def test_https_rejected(self):
+        with self.assertRaises(RemoteNotebookError):
+            RemoteNotebook("https://127.0.0.1:8642")
+
+    def test_idle_connections_dont_hold_workers(self):
+        self.server.shutdown()
+        self.server.server_close()
+        self._start_server(workers=2)
+        idle_clients = [RemoteNotebook(self.server_url, token=self.server.tokens.issue(f"idle{i}")) for i in range(3)]
+        for client in idle_clients:
+            client.notes()  # each leaves a kept-alive connection open
+        busy = RemoteNotebook(self.server_url, token=self.server.tokens.issue("busy"), timeout=2)
+        busy.take("note while others idle", shared=True)
+        assert [n.content for n in idle_clients[0].notes()] == ["note while others idle"]
+        for client in idle_clients + [busy]:
+            client.close()
+
+    def test_not_shared_by_default(self):
+        note = self.alice.take("alice note")
+        assert self.bob.get(note.doc_id) is None
+        anonymous = RemoteNotebook(self.server_url, token=None)
+        assert anonymous.notes() == []
+        anonymous.close()
+
+    def test_partial_requests_dont_hold_workers(self):
+        self.server.shutdown()
+        self.server.server_close()
+        self._start_server(workers=2)
+        stalled = [socket.create_connection(("127.0.0.1", self.server.server_port)) for _ in range(3)]
+        for sock in stalled:
+            sock.sendall(b"GET /no")
+        client = RemoteNotebook(self.server_url, token=self.server.tokens.issue("client"), timeout=2)
+        start = time.monotonic()
+        assert client.notes() == []
+        assert time.monotonic() - start < 1
+        client.close()
+        for sock in stalled:
+            sock.close()
+
+    def test_slow_request_closed(self):
+        self.server.request_timeout = 0.1
+        sock = socket.create_connection(("127.0.0.1", self.server.server_port), timeout=5)
+        sock.sendall(b"GET /notes HTTP/1.1\r\n")
+        assert sock.recv(1024) == b""  # closed without a response once the watcher next checks
+        sock.close()
+
+    def test_pipelined_requests(self):
+        sock = socket.create_connection(("127.0.0.1", self.server.server_port), timeout=5)
+        request = b"GET /notes/1 HTTP/1.1\r\nHost: x\r\n\r\n"
+        sock.sendall(request * 2)
+        responses = b""
+        while responses.count(b"HTTP/1.1 404") < 2:
+            responses += sock.recv(4096)
+        sock.close()
+
+    def test_non_ascii_digit_id(self):
+        sock = socket.create_connection(("127.0.0.1", self.server.server_port), timeout=5)
+        # request lines are read as latin-1, so this is a superscript 2 which str.isdigit() accepts
+        sock.sendall(b"GET /notes/\xb2 HTTP/1.1\r\nHost: x\r\n\r\n")
+        assert sock.recv(1024).startswith(b"HTTP/1.1 404")
+        sock.close()
+
+    def test_closed_idle_connection_reconnects(self):
+        self.server.idle_timeout = 0.1
+        self.alice.notes()
+        time.sleep(1.5)  # the server closes the connection meanwhile
+        note = self.alice.take("after idle")
+        assert [n.doc_id for n in self.alice.notes()] == [note.doc_id]
+
+    def test_failed_flush_undone(self):
+        store = self.server.store
+        write = store._storage.write
+
+        def failing_write(data):
+            raise OSError("disk full")
+
+        store._storage.write = failing_write
+        with self.assertRaises(RemoteNotebookError) as e:
+            self.alice.take("lost note")
+        assert e.exception.status == 500
+        assert self.alice.notes() == []
+
+        store._storage.write = write
+        note = self.alice.take("kept note")
+        assert [n.content for n in self.alice.notes()] == ["kept note"]
+        assert note.doc_id == 2
+
+    def test_writes_persisted(self):
+        for i in range(10):
+            self.alice.take(f"note {i}", ["work"])
+        self.server.shutdown()
+        self.server.server_close()
+        store = NotebookStore(self.db_path)
+        assert len(store.notes("alice", tag="work")) == 10
+        store.close()
+        self._start_server(workers=4)
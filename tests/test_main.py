@@ -1,4 +1,6 @@
+import tempfile
 import time
+from pathlib import Path
 from unittest import TestCase
 from unittest.mock import patch
 
@@ -18,8 +20,16 @@ _serialization.register_serializer(DateTimeSerializer(), "TinyDate")
 test_db = TinyDB(storage=_serialization)
 _notes_db = test_db.table("notes")
 
+_cache_dir = tempfile.TemporaryDirectory()
+_cache_path = Path(_cache_dir.name) / "completion_cache.json"
 
-@patch("simple_note_taker.core.notes._notes_db", new=_notes_db)
+_history_dir = tempfile.TemporaryDirectory()
+_history_path = Path(_history_dir.name) / "history.jsonl"
+
+
+@patch("simple_note_taker.core.notes.get_tiny_db", new=lambda: test_db)
+@patch("simple_note_taker.core.completion.completion_cache_path", new=_cache_path)
+@patch("simple_note_taker.core.history.history_file_path", new=_history_path)
 class TestTakeMain(TestCase):
     def setUp(self) -> None:
         _notes_db.truncate()
@@ -78,6 +88,44 @@ class TestTakeMain(TestCase):
         assert "note two" in match_res.stdout
         assert "note three" in match_res.stdout
 
+    def test_grep(self):
+        runner.invoke(app, ["take", "--note", "take out the bins"])
+        runner.invoke(app, ["take", "--note", "Bin day is Tuesday"])
+        runner.invoke(app, ["take", "--note", "make dinner"])
+        result = runner.invoke(app, ["grep", "bins?"])
+        assert result.exit_code == 0
+        assert "take out the bins" in result.stdout
+        assert "Bin day is Tuesday" in result.stdout
+        assert "make dinner" not in result.stdout
+        assert 'found 2 notes with content matching "bins?"' in result.stdout.lower()
+
+    def test_grep_count(self):
+        runner.invoke(app, ["take", "--note", "take out the bins"])
+        runner.invoke(app, ["take", "--note", "make dinner"])
+        result = runner.invoke(app, ["grep", "dinner", "--count"])
+        assert result.exit_code == 0
+        assert len(result.stdout.split("\n")) == 2
+        assert "found 1 notes" in result.stdout.lower()
+
+    def test_grep_tags(self):
+        runner.invoke(app, ["take", "--note", "note one", "--tags", "chores,home"])
+        runner.invoke(app, ["take", "--note", "note two", "--tags", "work"])
+        result = runner.invoke(app, ["grep", "^chore", "--field", "tags"])
+        assert result.exit_code == 0
+        assert "note one" in result.stdout
+        assert "note two" not in result.stdout
+
+    def test_grep_unicode_case_folding(self):
+        runner.invoke(app, ["take", "--note", "ſtraſſe"])
+        result = runner.invoke(app, ["grep", "strasse", "--count"])
+        assert result.exit_code == 0
+        assert "found 1 notes" in result.stdout.lower()
+
+    def test_grep_invalid_pattern(self):
+        result = runner.invoke(app, ["grep", "bins("])
+        assert result.exit_code == 2
+        assert "invalid pattern" in result.stdout.lower()
+
     def test_ls(self):
         for i in range(15):
             runner.invoke(app, ["take", "--note", f"note number {i}"])
@@ -206,3 +254,68 @@ class TestTakeMain(TestCase):
         result = runner.invoke(app, ["delete", "1", "--force"])
         assert result.exit_code == 1
         assert "No note under id 1 found." in result.stdout
+
+
+@patch("simple_note_taker.core.notes.get_tiny_db", new=lambda: test_db)
+@patch("simple_note_taker.core.completion.completion_cache_path", new=_cache_path)
+@patch("simple_note_taker.core.history.history_file_path", new=_history_path)
+class TestHistoryMain(TestCase):
+    def setUp(self) -> None:
+        _notes_db.truncate()
+        _history_path.write_text("")
+
+    def test_history(self):
+        runner.invoke(app, ["take", "--note", "note one"])
+        runner.invoke(app, ["edit", "1"], input="note one edited\n")
+        result = runner.invoke(app, ["history", "1"])
+        assert result.exit_code == 0
+        assert "note 1 has 2 revisions" in result.stdout.lower()
+        assert "Rev 0: " in result.stdout
+        assert "| note one\n" in result.stdout
+        assert "| note one edited (current)" in result.stdout
+
+    def test_revert(self):
+        runner.invoke(app, ["take", "--note", "note one"])
+        runner.invoke(app, ["edit", "1"], input="note one edited\n")
+        result = runner.invoke(app, ["revert", "1", "0"])
+        assert result.exit_code == 0
+        assert "reverted to revision 0" in result.stdout.lower()
+        ls_result = runner.invoke(app, ["ls"])
+        assert "note one edited" not in ls_result.stdout
+        history_result = runner.invoke(app, ["history", "1"])
+        assert "note 1 has 3 revisions" in history_result.stdout.lower()
+
+    def test_history_after_edit_outside_snt(self):
+        runner.invoke(app, ["take", "--note", "note one"])
+        runner.invoke(app, ["edit", "1"], input="note one edited\n")
+        _notes_db.update({"content": "hand edited"}, doc_ids=[1])
+        result = runner.invoke(app, ["history", "1"])
+        assert result.exit_code == 0
+        assert "changed outside of snt" in result.stdout
+        assert "note 1 has 1 revisions" in result.stdout.lower()
+        assert "Rev 2: outside of snt | hand edited (current)" in result.stdout
+
+    def test_history_after_unsaved_edit(self):
+        runner.invoke(app, ["take", "--note", "note one"])
+        with patch("tinydb.table.Table.update", side_effect=KeyboardInterrupt):
+            runner.invoke(app, ["edit", "1"], input="lost edit\n")
+        runner.invoke(app, ["edit", "1"], input="note one edited\n")
+        result = runner.invoke(app, ["history", "1"])
+        assert result.exit_code == 0
+        assert "lost edit" not in result.stdout
+        assert "Rev 0: " in result.stdout
+        assert "Rev 2: " in result.stdout
+        assert "| note one edited (current)" in result.stdout
+        revert_result = runner.invoke(app, ["revert", "1", "0"])
+        assert revert_result.exit_code == 0
+
+    def test_revert_missing_revision(self):
+        runner.invoke(app, ["take", "--note", "note one"])
+        result = runner.invoke(app, ["revert", "1", "3"])
+        assert result.exit_code == 1
+        assert "no revision 3" in result.stdout.lower()
+
+    def test_history_not_found(self):
+        result = runner.invoke(app, ["history", "1"])
+        assert result.exit_code == 1
+        assert "No note of ID 1 found" in result.stdout